@@ -0,0 +1,169 @@
+from argparse import ArgumentParser, Namespace
+import json
+import math
+from multiprocessing import get_context
+import os
+import random
+import resource
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "solve"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import generate_one_testcase  # noqa: E402
+from rcg import RCG  # noqa: E402
+from tcg import TCG, Vehicle  # noqa: E402
+from timing import Timing  # noqa: E402
+
+PHASES = ["build", "type_3", "solve", "reduce", "rcg", "deadlock", "schedule", "timing"]
+
+
+def generate(path: str, vehicles: int, num_cars: float, seed: int):
+    # generator.py testcase with about `vehicles` vehicles
+    weights = [0.2 + (num_cars - 2) * 0.1 * i for i in range(-2, 3)]
+    per_step = sum(i * w for i, w in enumerate(weights)) / sum(weights)
+    args = Namespace(
+        time=max(1, math.ceil(vehicles / per_step)),
+        num_cars=num_cars,
+        allow_u_turn=False,
+        pay_prob=0.25,
+        pay_max=100,
+        payment=False,
+    )
+    random.seed(seed)
+    generate_one_testcase(args, path)
+
+
+def run(path: str, horizon: float | None) -> dict:
+    # time each phase of the fcfs solver, run in a fresh process so the peak memory is its own
+    phases = {}
+    begin = perf_counter()
+
+    def lap(phase: str):
+        nonlocal begin
+        end = perf_counter()
+        phases[phase] = end - begin
+        begin = end
+
+    tcg = TCG(horizon)
+    with open(path) as input:
+        for line in input:
+            tcg.add_vehicle(Vehicle(*map(int, line.split())))
+    lap("build")
+    tcg.build_type_3_edge()
+    lap("type_3")
+    tcg.solve("fcfs")
+    lap("solve")
+    if horizon is not None:
+        tcg.reduce()
+    lap("reduce")
+    rcg = RCG()
+    rcg.add(tcg)
+    lap("rcg")
+    # the DFS finds the back edges that close a cycle
+    rcg.sort()
+    deadlock = rcg.has_deadlock()
+    lap("deadlock")
+    tcg.schedule()
+    lap("schedule")
+    Timing(tcg).evaluate()
+    lap("timing")
+    return {
+        "vehicles": len(tcg.vehicles),
+        "nodes": len(tcg.nodes),
+        "edges": len(tcg.edges),
+        "deadlock": deadlock,
+        "phases": phases,
+        "peak_memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,  # KB
+    }
+
+
+def benchmark(sizes: list[int], densities: list[float], seed: int, horizon: float | None) -> dict:
+    cases = []
+    context = get_context("fork")
+    with TemporaryDirectory() as directory:
+        for num_cars in densities:
+            for size in sizes:
+                path = os.path.join(directory, f"{size}_{num_cars}.txt")
+                generate(path, size, num_cars, seed)
+                with context.Pool(1) as pool:
+                    case = pool.apply(run, (path, horizon))
+                cases.append({"size": size, "num_cars": num_cars, "seed": seed, **case})
+                print(f"{size} vehicles, num_cars {num_cars}: {sum(case['phases'].values()):.3f}s", file=sys.stderr)
+    return {"horizon": horizon, "cases": cases}
+
+
+def slope(points: list[tuple[int, float]]) -> float:
+    # least squares exponent of time against vehicles, ignoring times below the timer noise
+    points = [(math.log(n), math.log(t)) for n, t in points if n > 0 and t > 1e-4]
+    if len(points) < 2:
+        return float("nan")
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    var = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / var if var else float("nan")
+
+
+def report(result: dict):
+    # seconds per phase against vehicle count and the fitted exponent
+    for num_cars in sorted({case["num_cars"] for case in result["cases"]}):
+        cases = sorted((case for case in result["cases"] if case["num_cars"] == num_cars), key=lambda c: c["size"])
+        print(f"num_cars {num_cars}")
+        print(f"{'vehicles':>10}", *[f"{case['vehicles']:>10}" for case in cases], f"{'exponent':>10}")
+        for phase in PHASES:
+            times = [case["phases"][phase] for case in cases]
+            exponent = slope([(case["vehicles"], t) for case, t in zip(cases, times)])
+            print(f"{phase:>10}", *[f"{t:>10.4f}" for t in times], f"{exponent:>10.2f}")
+        print(f"{'memory MB':>10}", *[f"{case['peak_memory'] / 1024:>10.1f}" for case in cases])
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    # print phases slower than the baseline by more than `tolerance`, return True if there is one
+    base = {(case["size"], case["num_cars"]): case for case in baseline["cases"]}
+    regressed = False
+    for case in result["cases"]:
+        other = base.get((case["size"], case["num_cars"]))
+        if other is None:
+            continue
+        for phase in PHASES:
+            old, new = other["phases"].get(phase, 0.0), case["phases"][phase]
+            if old > 1e-3 and new > old * tolerance:
+                print(
+                    f"regression {case['size']} vehicles, num_cars {case['num_cars']}, {phase}: {old:.4f}s -> {new:.4f}s"
+                )
+                regressed = True
+    return regressed
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", type=str, default="10,100,1000,10000,100000", help="vehicle counts")
+    parser.add_argument("--num_cars", type=str, default="2.0,3.0", help="generator densities")
+    parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--horizon", type=float, default=3.0, help="sparse conflict graph time horizon")
+    parser.add_argument("--dense", action="store_true", help="build all type 3 edges, only for small sizes")
+    parser.add_argument("-o", "--output", type=str, default="benchmark.json", help="result path")
+    parser.add_argument("--baseline", type=str, default=None, help="result to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    densities = [float(num_cars) for num_cars in args.num_cars.split(",")]
+    result = benchmark(sizes, densities, args.seed, None if args.dense else args.horizon)
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2)
+    report(result)
+    if args.baseline is not None:
+        with open(args.baseline) as input:
+            if compare(result, json.load(input), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
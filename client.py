@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+from collections import deque
+import json
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "solve"))
+
+from generator import draw  # noqa: E402
+from path import topology  # noqa: E402
+from server import connect  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", type=str, required=True, help="unix:[path] or [host]:[port] of solve --serve")
+    parser.add_argument("-t", "--time", type=int, default=10000)
+    parser.add_argument("-c", "--num_cars", type=float, default=2.0)
+    parser.add_argument("-u", "--allow_u_turn", action="store_true", default=False)
+    parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--pay_prob", type=float, default=0.25)
+    parser.add_argument("--pay_max", type=int, default=100)
+    parser.add_argument("--payment", action="store_true", default=False)
+    parser.add_argument("--topology", type=str, default=None)
+    parser.add_argument("-w", "--window", type=int, default=1, help="arrivals sent before waiting for a reply")
+    parser.add_argument("--testcase", type=str, default=None, help="write the arrivals sent")
+    parser.add_argument("--schedule", type=str, default=None, help="write the zone orders received")
+    args = parser.parse_args()
+    if args.topology is not None:
+        topology.load(args.topology)
+    return args
+
+
+async def run(args) -> dict:
+    # stream generated arrivals, time each one until its reservations come back
+    reader, writer = await connect(args.connect)
+    window = asyncio.Semaphore(args.window)
+    sent: deque[float] = deque()
+    latency: list[float] = []
+    reservations: list[list[tuple[int, int]]] = [[] for _ in topology.zones]
+    testcase = open(args.testcase, "w") if args.testcase else None
+    stats = {}
+
+    async def send():
+        for rows in draw(args, np.random.SeedSequence(args.seed)):
+            for row in rows.tolist():
+                await window.acquire()
+                line = " ".join(map(str, row)) + "\n"
+                sent.append(perf_counter())
+                writer.write(line.encode())
+                if testcase is not None:
+                    testcase.write(line)
+            await writer.drain()
+        writer.write(b"stats\n")
+
+    begin = perf_counter()
+    sender = asyncio.create_task(send())
+    while line := await reader.readline():
+        if line.startswith(b"{"):
+            stats = json.loads(line)
+            break
+        latency.append(perf_counter() - sent.popleft())
+        window.release()
+        if line.startswith(b"error"):
+            print(line.decode(), end="", file=sys.stderr)
+            continue
+        id, *fields = line.split()
+        for k in range(0, len(fields), 3):
+            reservations[int(fields[k])].append((int(fields[k + 1]), int(id)))
+    elapsed = perf_counter() - begin
+    await sender
+    writer.close()
+    if testcase is not None:
+        testcase.close()
+    if args.schedule:
+        with open(args.schedule, "w") as f:
+            for zone in reservations:
+                f.write(" ".join(str(id) for _, id in sorted(zone)) + "\n")
+    latency = np.array(latency) * 1e3
+    return {
+        "arrivals": len(latency),
+        "seconds": elapsed,
+        "arrivals per second": len(latency) / elapsed if elapsed > 0 else 0.0,
+        "p50 ms": float(np.percentile(latency, 50)) if len(latency) else 0.0,
+        "p99 ms": float(np.percentile(latency, 99)) if len(latency) else 0.0,
+        "server": stats,
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(parse_args())), indent=2))
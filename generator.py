@@ -1,5 +1,16 @@
 import random
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+from typing import Iterator
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "solve"))
+
+from binary import TestcaseWriter  # noqa: E402
+from path import topology  # noqa: E402
 
 
 def parse_args():
@@ -12,11 +23,26 @@ def parse_args():
     parser.add_argument("--seed", type=int, default=123)
     parser.add_argument("--pay_prob", type=float, default=0.25)
     parser.add_argument("--pay_max", type=int, default=100)
+    parser.add_argument("--fast", action="store_true", default=False)
+    parser.add_argument("--payment", action="store_true", default=False)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--binary", action="store_true", default=False)
+    parser.add_argument("--topology", type=str, default=None)
     args = parser.parse_args()
+    if args.binary and not args.fast:
+        parser.error("--binary needs --fast")
     random.seed(args.seed)
+    if args.topology is not None:
+        topology.load(args.topology)
     return args
 
 
+def allowed(args, start: int, end: int) -> bool:
+    # a route joins them, and it is no u-turn unless u-turns are allowed
+    route = topology.route_of(start, end)
+    return route != len(topology.routes) - 1 and (args.allow_u_turn or not topology.u_turn[route])
+
+
 #     | 0 | 3 |
 # | 0 | 0 | 3 | 3 |
 # | 1 | 1 | 2 | 2 |
@@ -27,37 +53,95 @@ def generate_one_testcase(args, path):
     weights = [0.2 + (args.num_cars - 2) * 0.1 * i for i in range(-2, 3)]
 
     with open(path, "w") as f:
-        zone = [i for i in range(4)]
-        zone = [i for i in range(4)]
+        exits = [i for i in range(len(topology.exits))]
 
         vehicle_id = 0
 
         for time in range(args.time):
-            num_vehicle = random.choices(range(5), weights=weights)[0]
+            num_vehicle = min(random.choices(range(5), weights=weights)[0], len(topology.approaches))
 
-            start_pos = random.sample(range(4), num_vehicle)
+            start_pos = random.sample(range(len(topology.approaches)), num_vehicle)
 
             for i in range(num_vehicle):
                 start = start_pos[i]
-                end = random.choice(zone)
+                end = random.choice(exits)
 
-                while start == (end + 1) % 4:
-                    if args.allow_u_turn:
-                        break
-                    end = random.choice(zone)
+                while not allowed(args, start, end):
+                    end = random.choice(exits)
 
                 is_want_to_pay = random.random() < args.pay_prob
                 payment = random.randint(1, args.pay_max) if is_want_to_pay else 0
 
-                f.write(f"{vehicle_id} {time} {start} {end}")  # no payment
+                f.write(f"{vehicle_id} {time} {start} {end}")
+                if args.payment:
+                    f.write(f" {payment}")
                 f.write("\n")
                 vehicle_id += 1
 
 
+# time steps drawn and written at once
+CHUNK = 1 << 16
+
+
+def draw(args, seed) -> Iterator[np.ndarray]:
+    # same distribution as generate_one_testcase, rows of id, time, start, end and payment with --payment,
+    # drawn with numpy a chunk of time steps at a time
+    rng = np.random.default_rng(seed)
+    weights = np.array([0.2 + (args.num_cars - 2) * 0.1 * i for i in range(-2, 3)])
+    approaches, exits = len(topology.approaches), len(topology.exits)
+    # exits allowed from each approach, counted from the exit of the same index
+    ends = [
+        [(start + k) % exits for k in range(exits) if allowed(args, start, (start + k) % exits)]
+        for start in range(approaches)
+    ]
+    count = np.array([len(end) for end in ends])
+    table = np.array([end + [0] * (exits - len(end)) for end in ends])
+    vehicle_id = 0
+
+    for begin in range(0, args.time, CHUNK):
+        steps = min(CHUNK, args.time - begin)
+        num_vehicle = np.minimum(rng.choice(5, size=steps, p=weights / weights.sum()), approaches)
+
+        # distinct start positions in each time step: the first num_vehicle of a random permutation
+        start_pos = rng.random((steps, approaches)).argsort(axis=1)
+        taken = np.arange(approaches) < num_vehicle[:, None]
+        start = start_pos[taken]
+        time = np.repeat(np.arange(begin, begin + steps), num_vehicle)
+
+        # end is any allowed exit, with the four default zones any but (start - 1) % 4 that makes a u-turn
+        high = count[0] if (count == count[0]).all() else count[start]
+        end = table[start, rng.integers(0, high, size=len(start))]
+
+        columns = [np.arange(vehicle_id, vehicle_id + len(start)), time, start, end]
+        if args.payment:
+            is_want_to_pay = rng.random(len(start)) < args.pay_prob
+            columns.append(np.where(is_want_to_pay, rng.integers(1, args.pay_max + 1, size=len(start)), 0))
+        vehicle_id += len(start)
+        yield np.stack(columns, axis=1)
+
+
+def generate_one_testcase_fast(args, path, seed):
+    f = TestcaseWriter(path) if args.binary else open(path, "w", buffering=1 << 20)
+    for rows in draw(args, seed):
+        if args.binary:
+            f.write(rows)
+        else:
+            line = " ".join(["%d"] * rows.shape[1]) + "\n"
+            f.write(line * len(rows) % tuple(rows.ravel().tolist()))
+    f.close()
+
+
 def main():
     args = parse_args()
-    for testcase_ind in range(args.testcase):
-        path = args.path + "/testcase" + str(testcase_ind) + ".txt"
+    extension = ".bin" if args.binary else ".txt"
+    paths = [args.path + "/testcase" + str(testcase_ind) + extension for testcase_ind in range(args.testcase)]
+    if args.fast:
+        # one seed per testcase, so the testcases do not depend on the number of workers
+        seeds = np.random.SeedSequence(args.seed).spawn(args.testcase)
+        with ProcessPoolExecutor(args.workers, initializer=topology.load, initargs=(topology.path,)) as executor:
+            list(executor.map(generate_one_testcase_fast, [args] * len(paths), paths, seeds))
+        return
+    for path in paths:
         generate_one_testcase(args, path)
 
 
@@ -1,67 +1,158 @@
+import pygame
+from argparse import ArgumentParser
+from bisect import insort
+import json
+import os
 import sys
-from path import get_path
 
-from vehicle import Vehicle, Group
-from zone import Zones, Zone
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "solve"))
+
+from binary import is_binary, read_schedule, read_testcase  # noqa: E402
+from path import get_path, topology  # noqa: E402
+
+from vehicle import Vehicle, Group  # noqa: E402
+from zone import Zones, Zone  # noqa: E402
+
+# simulated seconds without a release, an exit or an arrival before a headless run counts as a deadlock
+STALL = 10
 
 
 class MyGame(Zones):
-    def __init__(self):
-        super().__init__()
-        self.zones: list[Zone] = []
-        self.group = Group(self.screen, self.zones)
-        self.vehicles: dict[int, list[Vehicle]] = {}
+    def __init__(self, headless: bool = False):
+        super().__init__(headless)
+        self.group = Group(self.screen, self.zones, self.approaches)
+        # sorted by arrival time, vehicles before the cursor are on the road
+        self.arrivals: list[tuple[int, Vehicle]] = []
+        self.cursor = 0
 
-    def update(self, time: float, pause: bool):
+    def update(self, time: float, pause: bool) -> list[pygame.Rect]:
         for zone in self.zones:
-            zone.update(self.screen, self.time)
+            zone.update(self.time)
         self.group.update(time, self.zones, pause)
-        self.group.draw(self.screen)
-        to_add = []
-        for arri in self.vehicles:
-            if time > arri:
-                to_add.append(arri)
-        for arri in to_add:
-            self.group.add(*self.vehicles[arri])
-            self.vehicles.pop(arri)
+        drawn = []
+        if self.screen is not None:
+            drawn = [zone.rect for zone in self.zones if zone.lit] + self.group.draw(self.screen)
+        begin = self.cursor
+        while self.cursor < len(self.arrivals) and time > self.arrivals[self.cursor][0]:
+            self.cursor += 1
+        if self.cursor > begin:
+            self.group.add(*[vehicle for _, vehicle in self.arrivals[begin : self.cursor]])
 
         # print(f"\r{self.zones}", end="")
         if all([zone.finish for zone in self.zones]):
             self.pause = True
+        return drawn
 
     def add_vehicle(self, arri: int, vehicle: Vehicle):
-        if arri in self.vehicles:
-            self.vehicles[arri].append(vehicle)
+        # keep the arrivals sorted, testcases are already in arrival order
+        if self.arrivals and arri < self.arrivals[-1][0]:
+            insort(self.arrivals, (arri, vehicle), lo=self.cursor, key=lambda arrival: arrival[0])
         else:
-            self.vehicles[arri] = [vehicle]
+            self.arrivals.append((arri, vehicle))
 
     def load(self, file1: str, file2: str = None):
-        zones = [[] for _ in range(4)]
-        with open(file1) as f:
-            print("Loading testcase:", file1)
-            for line in f:
-                id, arri, start, end = map(int, line.split())
-                self.add_vehicle(arri, Vehicle(id, start, end))
-                for zone in get_path(start, end):
-                    zones[zone].append(id)
+        print("Loading testcase:", file1)
+        if is_binary(file1):
+            records = read_testcase(file1)
+            rows = list(zip(*[records[name].tolist() for name in ("id", "arrive", "start", "end")]))
+        else:
+            with open(file1) as f:
+                rows = [tuple(map(int, line.split()[:4])) for line in f]
         if file2 == None:
             print("No schedule file provided, using FCFS schedule")
-            for idx, zone in enumerate(zones):
-                self.zones.append(Zone(self.screen, idx, zone))
+            self.setup(rows)
+            return
+        print("Loading schedule:", file2)
+        if is_binary(file2):
+            self.setup(rows, [vids.tolist() for vids in read_schedule(file2)])
             return
         with open(file2) as f:
-            print("Loading schedule:", file2)
-            for idx, line in enumerate(f):
-                self.zones.append(Zone(self.screen, idx, list(map(int, line.split()))))
+            self.setup(rows, [list(map(int, line.split())) for line in f])
+
+    def setup(self, rows: list[tuple[int, int, int, int]], schedule: list[list[int]] | None = None):
+        # add the vehicles, zones take the schedule or first-come-first-serve order
+        zones = [[] for _ in topology.zones]
+        for id, arri, start, end in rows:
+            self.add_vehicle(arri, Vehicle(id, start, end, self.screen is None))
+            for zone in get_path(start, end):
+                zones[zone].append(id)
+        for idx, zone in enumerate(zones if schedule is None else schedule):
+            self.zones.append(Zone(self.screen, idx, zone))
+
+    def run_headless(self, step: float) -> bool:
+        # advance a fixed step per frame until every vehicle has left, as fast as the CPU allows
+        # return False if the vehicles stop moving
+        last = self.arrivals[-1][0] if self.arrivals else 0
+        progress = (self.time, [zone.release_time for zone in self.zones], len(self.group))
+        while self.cursor < len(self.arrivals) or len(self.group) > 0:
+            self.time += step
+            self.update(self.time, False)
+            state = ([zone.release_time for zone in self.zones], len(self.group))
+            if state != progress[1:]:
+                progress = (self.time, *state)
+            elif self.time - max(progress[0], last) > STALL:
+                return False
+        return True
+
+
+def free_flow(start: int, end: int, step: float) -> float:
+    # travel time of a vehicle alone in the intersection
+    game = MyGame(True)
+    game.setup([(0, 0, start, end)])
+    game.run_headless(step)
+    return game.arrivals[0][1].exit_time
+
+
+def report(game: MyGame, finished: bool, step: float) -> dict:
+    # completion time, share of it each zone is reserved, delay of each vehicle against free flow
+    free = {}
+    vehicles = []
+    for arri, vehicle in game.arrivals:
+        if vehicle.exit_time is None:
+            continue
+        key = (vehicle.start, vehicle.end)
+        if key not in free:
+            free[key] = free_flow(*key, step)
+        travel = vehicle.exit_time - arri
+        vehicles.append({"id": vehicle.id, "arrive": arri, "exit": vehicle.exit_time, "delay": travel - free[key]})
+    completion = max((vehicle["exit"] for vehicle in vehicles), default=0.0)
+    return {
+        "finished": finished,
+        "completion": completion,
+        "utilization": [zone.busy / completion if completion > 0 else 0.0 for zone in game.zones],
+        "vehicles": vehicles,
+    }
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument("testcase", type=str)
+    parser.add_argument("schedule", type=str, nargs="?", default=None)
+    parser.add_argument("--headless", action="store_true", help="no window, simulate as fast as possible")
+    parser.add_argument("--step", type=float, default=1 / 60, help="headless simulated seconds per frame")
+    parser.add_argument("--json", type=str, default=None, help="headless report path")
+    parser.add_argument("--topology", type=str, default=None, help="intersection layout file")
+    args = parser.parse_args()
+    return args
 
 
 if __name__ == "__main__":
-    game = MyGame()
-    args = sys.argv[1:]
-    if len(args) == 1:
-        game.load(args[0])
-    elif len(args) == 2:
-        game.load(args[0], args[1])
-    else:
-        exit("Usage: python simulate <testcase> <schedule>")
-    game.run()
+    args = parse_args()
+    if args.topology is not None:
+        topology.load(args.topology)
+    game = MyGame(args.headless)
+    game.load(args.testcase, args.schedule)
+    if not args.headless:
+        game.run()
+        exit()
+    result = report(game, game.run_headless(args.step), args.step)
+    if not result["finished"]:
+        print(f"Deadlock: {len(game.group)} vehicles stopped at {game.time:.2f}")
+    print(f"Completion time: {result['completion']:.2f}")
+    print("Zone utilization:", *[f"{zone:.1%}" for zone in result["utilization"]])
+    delays = [vehicle["delay"] for vehicle in result["vehicles"]]
+    if delays:
+        print(f"Delay: mean {sum(delays) / len(delays):.2f}, max {max(delays):.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
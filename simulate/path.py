@@ -1,33 +0,0 @@
-path_map = {
-    0: {
-        0: [0],
-        1: [0, 1],
-        2: [0, 1, 2],
-        3: [0, 1, 2, 3],
-    },
-    1: {
-        0: [1, 2, 3, 0],
-        1: [1],
-        2: [1, 2],
-        3: [1, 2, 3],
-    },
-    2: {
-        0: [2, 3, 0],
-        1: [2, 3, 0, 1],
-        2: [2],
-        3: [2, 3],
-    },
-    3: {
-        0: [3, 0],
-        1: [3, 0, 1],
-        2: [3, 0, 1, 2],
-        3: [3],
-    },
-}
-
-
-def get_path(start, end):
-    try:
-        return path_map[start][end]
-    except KeyError:
-        return []
@@ -1,6 +1,9 @@
+from functools import lru_cache
 from random import randrange
 from typing import Iterator
 
+import pygame
+
 
 def next_iter(iterable: Iterator[int]) -> int | None:
     try:
@@ -14,3 +17,15 @@ def gen_color():
     while sum(color) > 300 or sum(color) < 100:
         color = randrange(256), randrange(256), randrange(256)
     return color
+
+
+@lru_cache(maxsize=None)
+def get_font(size: int, bold: bool = False) -> pygame.font.Font:
+    # SysFont looks the font file up and loads it, share one per size
+    return pygame.font.SysFont("menlo", size, bold=bold)
+
+
+@lru_cache(maxsize=4096)
+def render_text(text: str, size: int, color: tuple[int, int, int], bold: bool = False) -> pygame.Surface:
+    # rendered text, labels and the clock repeat across frames
+    return get_font(size, bold).render(text, True, color)
@@ -3,9 +3,9 @@ from pygame import sprite
 from pygame.math import Vector2
 from enum import Enum
 
-from zone import Zone
-from path import get_path
-from utils import next_iter, gen_color
+from zone import Approach, Zone
+from path import get_path, topology
+from utils import next_iter, gen_color, get_font
 
 VEHICLE_RATIO = 0.08
 
@@ -19,30 +19,36 @@ class State(Enum):
 
 # Create a subclass of the Sprite class
 class Vehicle(sprite.Sprite):
-    def __init__(self, id: int, start: int, end: int):
+    def __init__(self, id: int, start: int, end: int, headless: bool = False):
         super().__init__()
         self.id = id
         self.start = start
         self.end = end
         self.color = gen_color()
+        self.headless = headless
         # enter state
         self.state = State.INIT
+        self.exit_time = None
 
         # states: [(1, 0), (2, 1), (4, 2), (6, 3)]
-        self.image = pygame.Surface((32, 32))
-        self.rect = self.image.get_rect()
-        self.image.fill((255, 255, 255), self.rect)
-        pygame.draw.rect(self.image, self.color, self.rect, 2)
-        self.draw_text(str(self.id), self.color)
-
-        path = get_path(self.start, self.end)
-        self.path = iter(path)
+        self.rect = pygame.Rect(0, 0, 32, 32)
+        if not headless:
+            self.image = pygame.Surface((32, 32))
+            self.image.fill((255, 255, 255), self.rect)
+            pygame.draw.rect(self.image, self.color, self.rect, 2)
+            self.draw_text(str(self.id), self.color)
+
+        self.route = get_path(self.start, self.end)
+        self.path = iter(self.route)
+        self.last = self.route[-1] if self.route else None
+        self.exit = tuple(topology.exits[self.end]["pos"]) if self.route else None
         self.release = lambda _: None
         self.dest = None
+        self.approach: Approach = None  # set when added to a group
+        self.ticket = 0  # place in the queue of the approach, counting vehicles already served
 
     def draw_text(self, text: str, color: tuple[int, int, int]):
-        font = pygame.font.SysFont("menlo", 20)
-        text_surf = font.render(text, True, color)
+        text_surf = get_font(20).render(text, True, color)
         text_rect = text_surf.get_rect()
         setattr(text_rect, "center", self.rect.center)
         self.image.blit(text_surf, text_rect)
@@ -75,8 +81,8 @@ class Vehicle(sprite.Sprite):
         cursor_pos = pygame.mouse.get_pos()
         if self.rect.collidepoint(cursor_pos):
             pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-            # for zone in get_path(self.start, self.end):
-            for zone in get_path(self.dest, self.end):
+            # zones left on the route
+            for zone in self.route[self.route.index(self.dest) :] if self.dest is not None else []:
                 zones[zone].turn_on(self.color)
         else:
             ...
@@ -84,34 +90,38 @@ class Vehicle(sprite.Sprite):
     def update(self, time: float, zones: list[Zone], pause: bool = False):
         # if self.id == 5:
         #     print(f"\r{self.state}", end="")
-        self.check_hovered(zones)
+        if not self.headless:
+            self.check_hovered(zones)
         if pause:
             return
         if self.state == State.INIT:
-            self.rect.center = zones[self.start].start
+            self.rect.center = self.approach.spawn
             self.center = Vector2(self.rect.center)
             self.dest = next_iter(self.path)
-            self.target = zones[self.start].pos
+            self.target = zones[self.approach.zone].pos
             self.enter = False
             self.state = State.QUEUE
             return
         elif self.state == State.QUEUE:
-            zone = zones[self.start]
-            pos = Vector2(zone.queue) * (zone.vehicles.index(self) * 41 + 50)
+            zone = zones[self.approach.zone]
+            index = self.ticket - self.approach.served
+            pos = Vector2(self.approach.direction) * (index * 41 + 50)
             pos = pos + Vector2(zone.pos)
             self.target = pos
+            center = self.center
             self.forward()
-            if zone.vehicles.index(self) == 0:
-                self.target = zones[self.start].pos
-                if self.distance() < 100 and zones[self.start].waiting == self.id:
+            if index == 0:
+                self.target = zone.pos
+                if self.distance() < 100 and zone.waiting == self.id:
                     self.enter = True
                     self.state = State.ZONE
-            return
+            # stopped behind the head, nothing changes until the queue moves
+            return index > 0 and self.center == center
         elif self.dest == None:
             # release the zone
             self.release(time)
             self.release = lambda _: None
-            self.target = zones[self.end].end
+            self.target = self.exit
             # keep going to final zone
             self.forward()
         elif self.target == None:
@@ -119,7 +129,9 @@ class Vehicle(sprite.Sprite):
             self.target = zones[self.dest].pos
         elif zones[self.dest].waiting == self.id:
             if self.enter:
-                zones[self.start].vehicles.remove(self)
+                resting = self.approach.leave()
+                for group in self.groups():
+                    group.wake(resting)
                 self.enter = False
             # release the zone
             self.release(time)
@@ -130,18 +142,19 @@ class Vehicle(sprite.Sprite):
             # wait for dest zone empty...
             pass
         if self.distance() < 2:
-            if self.dest == self.end:
+            if self.dest == self.last:
                 self.state = State.EXIT
             # close enough
             if self.dest == None:
                 # remove the vehicle
+                self.exit_time = time
                 self.kill()
                 return
             # update the release funciotn, ready to release the zone
             self.release = zones[self.dest].release
             # update dest zone, waiting zone to be empty...
             self.dest = next_iter(self.path)
-            if self.dest == self.end:
+            if self.dest == self.last:
                 self.state = State.EXIT
             self.target = None
 
@@ -149,19 +162,49 @@ class Vehicle(sprite.Sprite):
         return f"{self.id}"
 
 
-class Group(sprite.Group):
-    def __init__(self, screen: pygame.Surface, zones: list[Zone], *sprites):
+class Group(sprite.RenderUpdates):
+    def __init__(self, screen: pygame.Surface | None, zones: list[Zone], approaches: list[Approach], *sprites):
         super().__init__(*sprites)
         self.screen = screen
         self.zones = zones
+        self.approaches = approaches
+        # vehicles updated each frame in the order they were added, the rest wait in their queue
+        self.awake: dict[Vehicle, None] = {}
+        self.woken: list[Vehicle] = []
 
-    def update(self, *args, **kwargs):
-        super().update(*args, **kwargs)
+    def update(self, time: float, zones: list[Zone], pause: bool = False):
+        vehicles = list(self.awake)
+        k = 0
+        while k < len(vehicles):
+            vehicle = vehicles[k]
+            if vehicle.update(time, zones, pause):
+                del self.awake[vehicle]
+                vehicle.approach.resting.append(vehicle)
+            # the queue moved, update the vehicles behind it in this frame too
+            vehicles += self.woken
+            self.woken.clear()
+            k += 1
+        if self.screen is not None:
+            for approach in self.approaches:
+                for vehicle in approach.resting:
+                    vehicle.check_hovered(zones)
+
+    def wake(self, vehicles: list[Vehicle]):
+        for vehicle in vehicles:
+            self.awake[vehicle] = None
+        self.woken += vehicles
 
     def sprites(self) -> list[Vehicle]:
         return super().sprites()
 
     def add(self, *vehicles: Vehicle):
         for vehicle in vehicles:
-            self.zones[vehicle.start].vehicles.append(vehicle)
+            vehicle.approach = self.approaches[vehicle.start]
+            vehicle.ticket = vehicle.approach.served + len(vehicle.approach.vehicles)
+            vehicle.approach.vehicles.append(vehicle)
+            self.awake[vehicle] = None
         super().add(*vehicles)
+
+    def remove_internal(self, vehicle: Vehicle):
+        super().remove_internal(vehicle)
+        self.awake.pop(vehicle, None)
@@ -1,105 +1,137 @@
+from collections import deque
+
 import pygame
 
-from utils import next_iter
+from path import topology
+from utils import next_iter, get_font, render_text
 
 WAIT_TILL_RELEASE = 180
 TIME_OFFSET = -1
 
-ZONES: list[dict[str, tuple[int, int]]] = [
-    {"pos": (275, 275), "start": (275, 0), "end": (0, 275), "queue": (0, -1)},
-    {"pos": (275, 325), "start": (0, 325), "end": (275, 600), "queue": (-1, 0)},
-    {"pos": (325, 325), "start": (325, 600), "end": (600, 325), "queue": (0, 1)},
-    {"pos": (325, 275), "start": (600, 275), "end": (325, 0), "queue": (1, 0)},
-]
-
 
 class Zone:
-    def __init__(self, screen: pygame.Surface, id: int, vids: list[int] = [], size: int = 50):
+    def __init__(self, screen: pygame.Surface | None, id: int, vids: list[int] = [], size: int = 50):
         self.screen = screen
         self.id = id
-        self.pos = ZONES[id]["pos"]
-        self.start = ZONES[id]["start"]
-        self.end = ZONES[id]["end"]
-        self.queue = ZONES[id]["queue"]
+        self.pos = tuple(topology.zones[id]["pos"])
         self.size = size
         self.vids = iter(vids)
-        self.vehicles: list = []
         self.waiting = None
         self.release_time = 0
         self.finish = False
+        # time reserved for a vehicle, from waiting for it until it releases the zone
+        self.reserve_time = 0
+        self.busy = 0
+        # zone square for each background color, rendered once
+        self.surfaces: dict[tuple[int, int, int], pygame.Surface] = {}
+        self.rect = pygame.Rect(self.pos[0] - size / 2 - 1, self.pos[1] - size / 2 - 1, size + 2, size + 2)
+        self.lit = False  # highlighted this frame, restored from the background on the next
 
     def release(self, time: float):
         # record release time
         self.release_time = time
+        self.busy += time - self.reserve_time
         # not wait for anyone
         self.waiting = None
 
-    def update(self, screen: pygame.Surface, time: float):
+    def update(self, time: float):
+        self.lit = False
         if self.waiting == None and time - self.release_time > WAIT_TILL_RELEASE / 1000:
             # wait next vehicle
             self.waiting = next_iter(self.vids)
+            self.reserve_time = time
             if self.waiting == None:
                 self.finish = True
-        self.draw(screen)
 
     def turn_on(self, color: tuple[int, int, int]):
         # brighter
         self.draw(self.screen, (191 + color[0] // 4, 191 + color[1] // 4, 191 + color[2] // 4))
-
-    def draw(self, screen: pygame.Surface, bg: tuple[int, int, int] = (255, 255, 255)):
-        pos = (self.pos[0] - self.size / 2 - 1, self.pos[1] - self.size / 2 - 1)
-        pygame.draw.rect(screen, bg, pygame.Rect(pos, (self.size + 2, self.size + 2)))
-        pygame.draw.rect(screen, (0, 0, 0), pygame.Rect(pos, (self.size + 2, self.size + 2)), 2)
-        font = pygame.font.SysFont("menlo", 30, bold=True)
-        text_surface = font.render(str(self.id), True, (180, 180, 180))
-        text_rect = text_surface.get_rect()
-        setattr(text_rect, "center", self.pos)
-        screen.blit(text_surface, text_rect)
+        self.lit = True
+
+    def draw(self, screen: pygame.Surface, bg: tuple[int, int, int] = (255, 255, 255)) -> pygame.Rect:
+        if bg not in self.surfaces:
+            surface = pygame.Surface(self.rect.size)
+            surface.fill(bg)
+            pygame.draw.rect(surface, (0, 0, 0), surface.get_rect(), 2)
+            text_surface = render_text(str(self.id), 30, (180, 180, 180), True)
+            surface.blit(text_surface, text_surface.get_rect(center=surface.get_rect().center))
+            self.surfaces[bg] = surface
+        return screen.blit(self.surfaces[bg], self.rect)
 
     def __repr__(self):
         return f"[{self.id}: {self.finish}]"
 
 
+class Approach:
+    # queue of vehicles entering from one approach, it lines up away from its zone
+    def __init__(self, id: int):
+        self.id = id
+        self.zone = topology.approaches[id]["zone"]
+        self.spawn = tuple(topology.approaches[id]["spawn"])
+        self.direction = tuple(topology.approaches[id]["queue"])
+        self.vehicles: deque = deque()
+        self.served = 0  # vehicles that left the head of the queue
+        self.resting: list = []  # vehicles stopped in the queue until its head leaves
+
+    def leave(self) -> list:
+        # the head of the queue enters, return the vehicles that can move up
+        self.vehicles.popleft()
+        self.served += 1
+        resting, self.resting = self.resting, []
+        return resting
+
+
 class Zones:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((600, 600))
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("menlo", 30, bold=True)
+    def __init__(self, headless: bool = False):
+        # headless: no window, font or clock, time only moves in run_headless()
+        self.screen = None
+        if not headless:
+            pygame.init()
+            self.screen = pygame.display.set_mode(topology.size)
+            self.clock = pygame.time.Clock()
+            self.font = get_font(30, True)
+        self.zones: list[Zone] = []
+        self.approaches = [Approach(id) for id in range(len(topology.approaches))]
         self.time = TIME_OFFSET
         self.running = True
         self.pause = False
 
-    def draw_text(self, text: str, pos: tuple[int, int], color: tuple[int, int, int] = (0, 0, 0), align: str = "center"):
-        text_surface = self.font.render(text, True, color)
+    def draw_text(
+        self, text: str, pos: tuple[int, int], color: tuple[int, int, int] = (0, 0, 0), align: str = "center"
+    ) -> pygame.Rect:
+        text_surface = render_text(text, 30, color, True)
         text_rect = text_surface.get_rect()
         setattr(text_rect, align, pos)
-        self.screen.blit(text_surface, text_rect)
-
-    def draw_line(self, start: tuple[int, int], end: tuple[int, int], color: tuple[int, int, int] = (0, 0, 0)):
+        return self.screen.blit(text_surface, text_rect)
+
+    def draw_line(
+        self,
+        surface: pygame.Surface,
+        start: tuple[int, int],
+        end: tuple[int, int],
+        color: tuple[int, int, int] = (0, 0, 0),
+    ):
         start = (start[0] - 1, start[1] - 1)
         end = (end[0] - 1, end[1] - 1)
-        pygame.draw.line(self.screen, color, start, end, 2)
-
-    def draw_background(self):
-        self.draw_line((0, 250), (250, 250))
-        self.draw_line((350, 250), (600, 250))
-        self.draw_line((0, 300), (250, 300))
-        self.draw_line((350, 300), (600, 300))
-        self.draw_line((0, 350), (250, 350))
-        self.draw_line((350, 350), (600, 350))
-        self.draw_line((250, 0), (250, 250))
-        self.draw_line((250, 350), (250, 600))
-        self.draw_line((300, 0), (300, 250))
-        self.draw_line((300, 350), (300, 600))
-        self.draw_line((350, 0), (350, 250))
-        self.draw_line((350, 350), (350, 600))
-        self.draw_text(f"{self.time:.1f}", (585, 585), align="bottomright")
-
-    def update(self, time: float, pause: bool):
-        ...
+        pygame.draw.line(surface, color, start, end, 2)
+
+    def draw_background(self) -> pygame.Surface:
+        # lanes and zones never change, render them once and restore from it what moved
+        background = pygame.Surface(self.screen.get_size())
+        background.fill((255, 255, 255))
+        for start, end in topology.lines:
+            self.draw_line(background, start, end)
+        for zone in self.zones:
+            zone.draw(background)
+        return background
+
+    def update(self, time: float, pause: bool) -> list[pygame.Rect]: ...
 
     def run(self):
+        self.background = self.draw_background()
+        self.screen.blit(self.background, (0, 0))
+        pygame.display.flip()
+        dirty: list[pygame.Rect] = []  # drawn last frame, only these and what moves are sent to the display
         try:
             while self.running:
                 pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
@@ -107,10 +139,16 @@ class Zones:
                     self.time += self.clock.tick(60) / 1000
                 else:
                     self.clock.tick(60)
-                self.screen.fill((255, 255, 255))
-                self.draw_background()
-                self.update(self.time, self.pause)
-                pygame.display.flip()
+                for rect in dirty:
+                    self.screen.blit(self.background, rect, rect)
+                drawn = self.update(self.time, self.pause)
+                drawn.append(
+                    self.draw_text(
+                        f"{self.time:.1f}", (topology.size[0] - 15, topology.size[1] - 15), align="bottomright"
+                    )
+                )
+                pygame.display.update(dirty + drawn)
+                dirty = drawn
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         self.running = False
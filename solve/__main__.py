@@ -1,286 +1,428 @@
 from argparse import ArgumentParser
-from enum import Enum
-from itertools import combinations, pairwise, permutations
-from queue import Queue
-from random import random
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import glob
+from itertools import chain
+import json
+import os
 import sys
+from time import perf_counter
 from typing import TextIO
 
-from path import get_path
-
-# define constants
-TIME_ENTER_ZONE = 1.4
-TIME_CHANGE_ZONE = 0.85
-TIME_WAIT = 0.2
-
-
-class Vehicle:
-    def __init__(self, id: int, arrive_time: int, start: int, end: int):
-        self.id = id
-        self.arrive_time = arrive_time
-        self.start = start
-        self.end = end
-        self.path: list[TCG_Node] = []
-
-        for zone in get_path(start, end):
-            node = TCG_Node(id, zone, arrive_time)
-            self.path.append(node)
-
-    def __repr__(self):
-        return f"{' → '.join(map(str, self.path))}"
-
-
-class TCG_Node:
-    def __init__(self, vid: int, zid: int, time: int):
-        super().__init__()
-        self.vid = vid
-        self.zid = zid
-        self.outgoing: list[TCG_Edge] = []
-        self.in_degree = 0
-        self.time_enter = time + TIME_ENTER_ZONE
-        self.time_leave = 0
-
-    def link_to(self, other: "TCG_Node", type: int):
-        edge = TCG_Edge(type, self, other)
-        self.outgoing.append(edge)
-        return edge
-
-    def __repr__(self):
-        return f"({self.vid}, {self.zid})"
-
-
-class TCG_Edge:
-    def __init__(self, type: int, start: TCG_Node, end: TCG_Node):
-        self.type = type
-        self.start = start
-        self.end = end
-
-    def reverse(self):
-        # only reverse type 3 edge
-        if self.type != 3:
-            return
-        self.start, self.end = self.end, self.start
-        # update outgoing list
-        self.start.outgoing.append(self)
-        self.end.outgoing.remove(self)
-
-    def __repr__(self):
-        return f"TCGE({self.type}, {self.start} → {self.end})"
-
-    def __eq__(self, other: tuple[int, int, int, int]):
-        return (self.start.vid, self.start.zid, self.end.vid, self.end.zid) == other
-
-    def __hash__(self):
-        return hash((self.start.vid, self.start.zid, self.end.vid, self.end.zid))
-
-
-class TCG:
-    def __init__(self):
-        super().__init__()
-        self.nodes: list[TCG_Node] = []
-        self.edges: list[TCG_Edge] = []
-        self.vehicles: list[Vehicle] = []
-        self.prev: list[Vehicle] = [None, None, None, None]  # prev vehicle for each zone
-
-    def build(self, input: TextIO):
-        # keep reading until eof
-        # handle type 1 edge and type 2 edge
-        for line in input:
-            vehicle = Vehicle(*map(int, line.split()))
-            self.add_vehicle(vehicle)
-        # handle type 3 edge
-        self.build_type_3_edge()
-
-    def add_vehicle(self, vehicle: Vehicle):
-        self.vehicles.append(vehicle)
-        # add nodes to graph
-        for node in vehicle.path:
-            self.nodes.append(node)
-        # handle type 1 edge
-        for start, end in pairwise(vehicle.path):
-            edge = start.link_to(end, 1)
-            self.edges.append(edge)
-        # handle type 2 edge
-        if self.prev[vehicle.start] is not None:
-            for node1, node2 in zip(vehicle.path, self.prev[vehicle.start].path):
-                edge = node2.link_to(node1, 2)
-                self.edges.append(edge)
-        self.prev[vehicle.start] = vehicle
-
-    def build_type_3_edge(self):
-        for zid in range(4):
-            nodes = [node for node in self.nodes if node.zid == zid]
-            for node1, node2 in combinations(nodes, 2):
-                if self.vehicles[node1.vid].start != self.vehicles[node2.vid].start:
-                    edge = node2.link_to(node1, 3)
-                    self.edges.append(edge)
-
-    def solve(self, method: str):
-        if method == "fcfs":
-            for edge in self.edges:
-                if edge.type == 3 and edge.start.vid > edge.end.vid:
-                    edge.reverse()
-        if method == "random":
-            for edge in self.edges:
-                if edge.type == 3 and edge.start.vid > edge.end.vid and random() < 0.5:
-                    edge.reverse()
-
-    zone_empty_time: list[int] = [0, 0, 0, 0]
-
-    def schedule(self):
-        TCG.zone_empty_time = [0, 0, 0, 0]
-        # topological sort
-        zones: list[list[TCG_Node]] = [[], [], [], []]
-        # reset in degree
-        for node in self.nodes:
-            node.in_degree = 0
-        # calculate in degree for each node
-        for edge in self.edges:
-            edge.end.in_degree += 1
-        # find source nodes
-        queue: Queue[TCG_Node] = Queue()
-        for node in self.nodes:
-            if node.in_degree == 0:
-                queue.put(node)
-        while not queue.empty():
-            node = queue.get()
-            zones[node.zid].append(node)
-            for edge in node.outgoing:
-                edge.end.in_degree -= 1
-                # add to queue if in degree is 0
-                if edge.end.in_degree == 0:
-                    queue.put(edge.end)
-        return zones
-
-    def __repr__(self):
-        return f"TCG({len(self.vehicles)} vehicles, {len(self.nodes)} nodes, {len(self.edges)} edges)"
-
-
-class Color(Enum):
-    WHITE = 0  # unvisited
-    GRAY = 1  # visited
-    BLACK = 2  # finished
-
-
-class RCG_Node:
-    def __init__(self, vid: int, start: int, end: int):
-        self.vid = vid
-        self.start = start
-        self.end = end
-        self.color = Color.WHITE
-        self.outgoing: list["RCG_Edge"] = []
-
-    def link_to(self, other: "RCG_Node"):
-        edge = RCG_Edge(self, other)
-        self.outgoing.append(edge)
-        return edge
-
-    def __repr__(self):
-        return f"({self.vid}, {self.start}, {self.end})"
-
-
-class RCG_Edge:
-    def __init__(self, start: "RCG_Node", end: "RCG_Node"):
-        self.start = start
-        self.end = end
-
-    def __repr__(self):
-        return f"RCGE({self.start} → {self.end})"
-
-
-class RCG:
-    def __init__(self):
-        self.nodes: list[RCG_Node] = []
-        self.edges: list[RCG_Edge] = []
-        # start_vid, start_zid, end_vid, end_zid
-        self.TCG_edges: dict[tuple[int, int, int, int], int] = {}
-
-    def build(self, tcg: TCG):
-        # create TCG edges dict for fast search
-        self.TCG_edges = {}
-        for edge in tcg.edges:
-            # if self.TCG_edges.get((edge.start.vid, edge.start.zid, edge.end.vid, edge.end.zid)) != None:
-            #     print(
-            #         (edge.start.vid, edge.start.zid, edge.end.vid, edge.end.zid),
-            #         self.TCG_edges.get((edge.start.vid, edge.start.zid, edge.end.vid, edge.end.zid)),
-            #     )
-            self.TCG_edges[edge] = edge.type
-
-        # create RCG nodes from TCG type 1 edges
-        for edge in tcg.edges:
-            if edge.type == 1:
-                node = RCG_Node(edge.start.vid, edge.start.zid, edge.end.zid)
-                self.nodes.append(node)
-
-        def add_edge(vid1, zid1, vid2, zid2):
-            if self.TCG_edges.get((vid1, zid1, vid2, zid2)) != None:
-                edge = node1.link_to(node2)
-                self.edges.append(edge)
-
-        # create RCG edges from TCG type 2 and 3 edges
-        for node1, node2 in permutations(self.nodes, 2):
-            # create the RCG edges (type a)
-            if node1.vid == node2.vid:
-                add_edge(node1.vid, node1.start, node2.vid, node2.start)
-                continue
-            # create the RCG edges (type b)
-            add_edge(node1.vid, node1.start, node2.vid, node2.start)
-            # create the RCG edges (type c)
-            add_edge(node1.vid, node1.end, node2.vid, node2.end)
-            # create the RCG edges (type d)
-            add_edge(node1.vid, node1.start, node2.vid, node2.end)
-            # create the RCG edges (type e)
-            add_edge(node1.vid, node1.end, node2.vid, node2.start)
-
-    # return True if there is a cycle
-    def dfs(self, node: RCG_Node) -> bool:
-        node.color = Color.GRAY
-        for edge in node.outgoing:
-            if edge.end.color == Color.GRAY:
-                return True
-            if edge.end.color == Color.WHITE:
-                if self.dfs(edge.end):
-                    return True
-        node.color = Color.BLACK
-        return False
-
-    def has_deadlock(self) -> bool:
-        # use DFS to check if there is a cycle
-        for node in self.nodes:
-            if self.dfs(node):
-                return True
-        return False
-
-    def __repr__(self):
-        return f"RCG({len(self.nodes)} nodes, {len(self.edges)} edges)"
-
-
-def main(input: TextIO, output: TextIO, strategy: str):
-
-    tcg = TCG()
-    tcg.build(input)
+import numpy as np
+
+from anneal import anneal
+from binary import is_binary, read_testcase, write_schedule
+from compact import CompactTCG
+from exact import exact
+from network import Network, read_trips
+from path import topology
+from rcg import RCG
+from server import serve
+from stats import Stats
+from tcg import TCG, TCG_Edge, TIME_CHANGE_ZONE, Vehicle
+from timing import Timing
+
+
+def orient(
+    tcg: TCG,
+    strategy: str,
+    horizon: float | None,
+    budget: float,
+    log: TextIO = sys.stdout,
+    stats: Stats = Stats(False),
+) -> tuple[RCG, Timing, int]:
+    # orient the type 3 edges with the strategy until there is no deadlock
+    # return the RCG, the timing and the number of retries
+    if strategy == "weighted":
+        # first-come-first-serve delays to report against, then back to the built orientation
+        edges = tcg.solve("fcfs")
+        baseline = Timing(tcg)
+        fcfs = baseline.evaluate()
+        for edge in edges:
+            edge.reverse()
+    with stats.phase("solve"):
+        stats.count("reversed", len(tcg.solve(strategy)))
+    with stats.phase("rcg"):
+        rcg = RCG()
+        rcg.build(tcg)
+    if strategy in ("repair", "weighted"):
+        with stats.phase("repair"):
+            # repair also breaks the cycles of the zone orders, so it never falls back to the retries below
+            flips = rcg.repair(tcg if strategy == "repair" else None)
+        stats.count("reversed", flips)
+        print(f"{rcg} -> {flips} flips", file=log)
+    # update rcg with the reversed edges until no deadlock
+    retries = 0
+    edges = None  # reversed since the last schedule, None to schedule from scratch
+    while tcg.has_cycle(edges) or rcg.has_deadlock():
+        with stats.phase(f"retry {retries + 1}"):
+            nodes, _ = rcg.cycle()
+            print(f"{rcg} -> deadlock", *nodes, file=log)
+            with stats.phase("solve"):
+                edges = tcg.solve(strategy)
+            with stats.phase("rcg"):
+                rcg.update(edges)
+        stats.count("reversed", len(edges))
+        retries += 1
+
+    print(rcg, file=log)
+    # print(*rcg.edges.values(), sep="\n")
+
+    with stats.phase("timing"):
+        timing = Timing(tcg)
+    if strategy == "weighted" and len(timing.last):
+        time = timing.evaluate()
+        print(
+            f"fcfs delay {baseline.delay(fcfs).mean():.2f}, weighted {baseline.weighted_delay(fcfs):.2f}",
+            f"-> delay {timing.delay(time).mean():.2f}, weighted {timing.weighted_delay(time):.2f}",
+            file=log,
+        )
+    if strategy == "anneal":
+        with stats.phase("anneal"):
+            start, best, moves, flips = anneal(tcg, rcg, timing, budget)
+        stats.count("moves", moves)
+        stats.count("reversed", flips)
+        print(f"fcfs makespan {start:.2f} -> {best:.2f} after {moves} moves", file=log)
+    if strategy == "exact":
+        with stats.phase("exact"):
+            start, best, search = exact(tcg, rcg, timing, budget)
+        stats.count("search nodes", search["nodes"])
+        stats.count("reversed", search["reversed"])
+        print(
+            f"fcfs makespan {start:.2f} -> {best:.2f}",
+            "optimal" if search["proven"] else "not proven",
+            f"after {search['nodes']} nodes in {search['time']:.2f}s,",
+            f"pruned {search['bound']} by bound, {search['deadlock']} by deadlock, {search['memo']} by memo",
+            file=log,
+        )
+    if horizon is not None:
+        # reversing a chain edge loses the order of its neighbours, so collapse once the orientation is final
+        with stats.phase("reduce"):
+            zones = tcg.reduce()
+        # the sparse graph leaves vehicles far apart unordered and its RCG misses their waits, so on each deadlock
+        # the chains close, sort the zone order first-come-first-serve between a pair against it on the cycle,
+        # which keeps each approach in order and leaves fewer inversions every time
+        with stats.phase("rcg"):
+            rcg = RCG()
+            rcg.build(tcg)
+        position = {node: k for nodes in zones for k, node in enumerate(nodes)}
+        removed: dict[TCG_Edge, None] = {}
+        sorts = 0
+        while rcg.has_deadlock():
+            with stats.phase("repair"):
+                _, edges = rcg.cycle()
+                edge = next(edge for edge in edges if edge.start.vid > edge.end.vid)
+                # only the chain edges at the sorted nodes change, apply them to the RCG in place
+                old, new = tcg.resort(zones[edge.start.zid], position, position[edge.start], position[edge.end])
+                removed.update(dict.fromkeys(old))
+                for tcg_edge in old:
+                    rcg.unlink(tcg_edge.start, tcg_edge.end)
+                for tcg_edge in new:
+                    rcg.link(tcg_edge.start, tcg_edge.end)
+                rcg.insert()
+            sorts += 1
+        if removed:
+            tcg.edges = [edge for edge in tcg.edges if edge not in removed]
+        stats.count("sorts", sorts)
+        if sorts:
+            print(f"{rcg} -> {sorts} sorts", file=log)
+        with stats.phase("timing"):
+            timing = Timing(tcg)
+    stats.set("retries", retries)
+    stats.set("rcg nodes", len(rcg.nodes))
+    stats.set("rcg edges", len(rcg.edges))
+    stats.set("dfs visits", rcg.visits)
+    return rcg, timing, retries
+
+
+def read(input: TextIO | np.ndarray) -> list[Vehicle]:
+    # vehicles of a text testcase or of binary testcase records
+    if isinstance(input, np.ndarray):
+        columns = ("id", "arrive", "start", "end", "payment")
+        return [Vehicle(*row) for row in zip(*[input[name].tolist() for name in columns])]
+    return [Vehicle(*map(int, line.split())) for line in input]
+
+
+def write(output: TextIO | str, zones: list[list[int]]):
+    # a path is written in the binary schedule format
+    if isinstance(output, str):
+        write_schedule(output, zones)
+        return
+    for zone in zones:
+        output.write(" ".join(map(str, zone)) + "\n")
+
+
+def main(
+    input: TextIO | np.ndarray,
+    output: TextIO | str,
+    strategy: str,
+    horizon: float | None = None,
+    budget: float = 1.0,
+    stats: Stats = Stats(False),
+) -> dict:
+    # return a summary of the run
+    begin = perf_counter()
+    tcg = TCG(horizon)
+    with stats.phase("parse"):
+        vehicles = read(input)
+    with stats.phase("type 1 2"):
+        for vehicle in vehicles:
+            tcg.add_vehicle(vehicle)
+    with stats.phase("type 3"):
+        tcg.build_type_3_edge()
     print(tcg)
+    summary = {"vehicles": len(tcg.vehicles), "nodes": len(tcg.nodes), "edges": len(tcg.edges), "retries": 0}
+    stats.set("vehicles", len(tcg.vehicles))
+    stats.set("nodes", len(tcg.nodes))
+    for edge in tcg.edges if stats.enabled else []:
+        stats.count(f"type {edge.type} edges")
     # print(*tcg.vehicles, sep="\n")
     # print(*tcg.edges, sep="\n")
     # print(*[edge for edge in tcg.edges], sep="\n")
 
-    # regenerate rcg until no deadlock
-    while True:
-        tcg.solve(strategy)
-        rcg = RCG()
-        rcg.build(tcg)
-        if not rcg.has_deadlock():
-            break
-        print(f"{rcg} -> deadlock")
+    rcg, timing, summary["retries"] = orient(tcg, strategy, horizon, budget, sys.stdout, stats)
+
+    with stats.phase("schedule"):
+        schedule = tcg.schedule()
+
+    with stats.phase("timing"):
+        time = timing.evaluate()
+    # no delay to report without a vehicle that enters a zone
+    if time is not None and len(timing.last):
+        timing.apply(time)
+        delay = timing.delay(time)
+        print(
+            f"makespan {timing.makespan(time):.2f}, mean delay {delay.mean():.2f}, max delay {delay.max():.2f},",
+            f"weighted delay {timing.weighted_delay(time):.2f}",
+        )
+        summary["makespan"] = timing.makespan(time)
+        summary["delay"] = float(delay.mean())
+        summary["weighted delay"] = timing.weighted_delay(time)
+
+    for zid in range(len(topology.zones)):
+        print(zid, *[f"({node.vid}, {node.time_enter:.2f})" for node in schedule[zid]], sep=" ")
+    write(output, [[node.vid for node in schedule[zid]] for zid in range(len(topology.zones))])
 
-    print(rcg)
-    # print(*rcg.edges, sep="\n")
+    summary["time"] = perf_counter() - begin
+    return summary
 
-    schedule = tcg.schedule()
 
-    for zid in range(4):
-        print(zid, *[f"({node.vid}, {node.time_enter:.2f})" for node in schedule[zid]], sep=" ")
-        output.write(" ".join([str(node.vid) for node in schedule[zid]]) + "\n")
+def main_compact(input: TextIO | np.ndarray, output: TextIO | str, strategy: str, horizon: float | None = None) -> dict:
+    # main on the array-backed TCG, for fcfs and random only
+    begin = perf_counter()
+    tcg = CompactTCG(horizon)
+    tcg.build(input)
+    print(tcg)
+    summary = {"vehicles": len(tcg.ids), "nodes": len(tcg.vid), "edges": len(tcg.type), "retries": 0}
+
+    tcg.solve(strategy)
+    if horizon is not None:
+        tcg.reduce()
+    # reverse more edges until no deadlock
+    while tcg.has_deadlock():
+        print(f"{tcg} -> deadlock")
+        tcg.solve(strategy)
+        if horizon is not None:
+            # reversing a chain edge loses the order of its neighbours, collapse the new orders again
+            tcg.reduce()
+        summary["retries"] += 1
+
+    schedule = tcg.schedule()
+    write(output, [tcg.vid[schedule[zid]].tolist() for zid in range(len(topology.zones))])
+
+    summary["time"] = perf_counter() - begin
+    return summary
+
+
+def stream(
+    input: TextIO, output: TextIO, strategy: str, lookahead: float, horizon: float | None = None, budget: float = 1.0
+):
+    # rolling horizon: each time the arrival time moves on, solve the vehicles in the window,
+    # commit the zone orders of the ones that arrived more than `lookahead` ago and drop them
+    # each output line is a zone followed by the vehicles appended to its order
+    window: list[tuple[int, ...]] = []  # (id, arrive_time, start, end[, payment])
+    for line in chain(input, [None]):
+        record = tuple(map(int, line.split())) if line is not None else None
+        if window and (record is None or record[1] > window[-1][1]):
+            cutoff = record[1] - lookahead if record is not None else float("inf")
+            frozen = sum(1 for row in window if row[1] <= cutoff)
+            if frozen > 0:
+                commit(window, frozen, output, strategy, horizon, budget)
+                window = window[frozen:]
+        if record is not None:
+            window.append(record)
+
+
+def commit(
+    window: list[tuple[int, ...]],
+    frozen: int,
+    output: TextIO,
+    strategy: str,
+    horizon: float | None,
+    budget: float,
+):
+    # vehicles are renumbered in the window, the first `frozen` ones go before the rest in every zone
+    tcg = TCG(horizon)
+    for vid, (_, *record) in enumerate(window):
+        tcg.add_vehicle(Vehicle(vid, *record))
+    tcg.build_type_3_edge()
+    for edge in tcg.edges:
+        if edge.type == 3 and (edge.start.vid < frozen) != (edge.end.vid < frozen):
+            if edge.start.vid >= frozen:
+                edge.reverse()
+            edge.type = 4
+    print(tcg, file=sys.stderr)
+    orient(tcg, strategy, horizon, budget, sys.stderr)
+    schedule = tcg.schedule()
+    for zid in range(len(topology.zones)):
+        vids = [window[node.vid][0] for node in schedule[zid] if node.vid < frozen]
+        if vids:
+            output.write(f"{zid} " + " ".join(map(str, vids)) + "\n")
+    output.flush()
+
+
+def solve_file(path: str, strategy: str, horizon: float | None, budget: float) -> dict:
+    # solve one testcase in a batch worker, the schedule is written next to it
+    try:
+        if is_binary(path):
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                summary = main(read_testcase(path), os.path.splitext(path)[0] + ".schedule", strategy, horizon, budget)
+            return {"file": path, **summary}
+        with open(path) as input, open(os.path.splitext(path)[0] + ".schedule", "w") as output:
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                return {"file": path, **main(input, output, strategy, horizon, budget)}
+    except Exception as error:
+        return {"file": path, "error": repr(error)}
+
+
+def batch(pattern: str, workers: int | None, strategy: str, horizon: float | None, budget: float) -> dict:
+    # solve every testcase of a directory or glob, one worker process keeps solving files
+    paths = sorted(glob.glob(os.path.join(pattern, "*.txt") if os.path.isdir(pattern) else pattern))
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (4 * workers))
+    with ProcessPoolExecutor(workers, initializer=topology.load, initargs=(topology.path,)) as executor:
+        files = list(
+            executor.map(
+                solve_file,
+                paths,
+                [strategy] * len(paths),
+                [horizon] * len(paths),
+                [budget] * len(paths),
+                chunksize=chunksize,
+            )
+        )
+    return {"strategy": strategy, "horizon": horizon, "budget": budget, "files": files}
+
+
+def solve_intersection(
+    path: str, rows: list[tuple[int, float, int, int]], strategy: str, horizon: float | None, budget: float
+) -> tuple[list[float], list[list[int]]]:
+    # solve one intersection of a network in a worker, rows are (id, arrive_time, start, end) in arrival order
+    # return the time each vehicle leaves and the zone orders by vehicle id
+    if topology.path != path:
+        topology.load(path)
+    if not rows:
+        return [], [[] for _ in topology.zones]
+    tcg = TCG(horizon)
+    for vid, (_, arrive_time, start, end) in enumerate(rows):
+        tcg.add_vehicle(Vehicle(vid, arrive_time, start, end))
+    tcg.build_type_3_edge()
+    with open(os.devnull, "w") as devnull:
+        _, timing, _ = orient(tcg, strategy, horizon, budget, devnull)
+    time = timing.evaluate()
+    if time is None:
+        raise ValueError(f"{path}: the oriented conflict graph has a cycle")
+    schedule = tcg.schedule()
+    leave = (time[timing.last] + TIME_CHANGE_ZONE).tolist()
+    return leave, [[rows[node.vid][0] for node in schedule[zid]] for zid in range(len(topology.zones))]
+
+
+def network(
+    path: str,
+    input: TextIO,
+    output: str,
+    strategy: str,
+    horizon: float | None = None,
+    budget: float = 1.0,
+    workers: int | None = None,
+    rounds: int = 100,
+) -> dict:
+    # split trips into the arrivals of each intersection and solve the intersections in worker processes,
+    # the time a vehicle leaves one plus the link travel time is its arrival at the next
+    # each round solves the changed intersections none of whose upstream ones changed, or every changed one
+    # when they feed each other in a loop, until no arrival time changes
+    begin = perf_counter()
+    net = Network(path)
+    trips = read_trips(input)
+    hops = [net.hops(intersection, start, ends) for _, _, intersection, start, ends in trips]
+    # arrival time at each intersection of a trip, free flow to begin with
+    arrivals = []
+    for (_, arrive_time, *_), trip in zip(trips, hops):
+        times = [float(arrive_time)]
+        for (intersection, start, end, _), (*_, travel) in zip(trip, trip[1:]):
+            times.append(times[-1] + net.free(intersection, start, end) + travel)
+        arrivals.append(times)
+    # (trip, hop) of the vehicles at each intersection
+    visits: list[list[tuple[int, int]]] = [[] for _ in net.names]
+    for v, trip in enumerate(hops):
+        for k, (intersection, *_) in enumerate(trip):
+            visits[intersection].append((v, k))
+    leave = [[0.0] * len(trip) for trip in hops]
+    schedules: list[list[list[int]]] = [[] for _ in net.names]
+    dirty = set(range(len(net.names)))
+    iterations, solves = 0, 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        while dirty and iterations < rounds:
+            ready = sorted(k for k in dirty if net.upstream[k].isdisjoint(dirty)) or sorted(dirty)
+            orders = {}
+            for k in ready:
+                orders[k] = sorted(visits[k], key=lambda visit: (arrivals[visit[0]][visit[1]], trips[visit[0]][0]))
+            results = executor.map(
+                solve_intersection,
+                [net.topologies[k] for k in ready],
+                [[(trips[v][0], arrivals[v][h], *hops[v][h][1:3]) for v, h in orders[k]] for k in ready],
+                [strategy] * len(ready),
+                [horizon] * len(ready),
+                [budget] * len(ready),
+            )
+            dirty.difference_update(ready)
+            for k, (times, zones) in zip(ready, results):
+                schedules[k] = zones
+                for (v, h), time in zip(orders[k], times):
+                    leave[v][h] = time
+                    if h + 1 == len(hops[v]):
+                        continue
+                    after = time + hops[v][h + 1][3]
+                    if abs(after - arrivals[v][h + 1]) > 1e-9:
+                        arrivals[v][h + 1] = after
+                        dirty.add(hops[v][h + 1][0])
+            iterations += 1
+            solves += len(ready)
+            print(f"round {iterations}: solved", *[net.names[k] for k in ready], file=sys.stderr)
+
+    os.makedirs(output, exist_ok=True)
+    for name, zones in zip(net.names, schedules):
+        with open(os.path.join(output, f"{name}.schedule"), "w") as f:
+            write(f, zones)
+    # delay of each trip against driving through every intersection without waiting
+    delays = [
+        times[-1] - arrive_time - sum(net.free(*hop[:3]) + hop[3] for hop in trip)
+        for (_, arrive_time, *_), trip, times in zip(trips, hops, leave)
+    ]
+    return {
+        "intersections": len(net.names),
+        "vehicles": len(trips),
+        "rounds": iterations,
+        "solves": solves,
+        "stable": not dirty,
+        "makespan": max((times[-1] for times in leave), default=0.0),
+        "mean delay": sum(delays) / len(delays) if delays else 0.0,
+        "max delay": max(delays, default=0.0),
+        "time": perf_counter() - begin,
+    }
 
 
 # parse arguments
@@ -289,18 +431,76 @@ def parse_args():
     parser.add_argument("-s", "--strategy", type=str, default="fcfs", help="scheduling strategy")
     parser.add_argument("-i", "--input", type=str, default=None, help="input file")
     parser.add_argument("-o", "--output", type=str, default=None, help="output file")
+    parser.add_argument("--horizon", type=float, default=None, help="sparse conflict graph time horizon")
+    parser.add_argument("--budget", type=float, default=1.0, help="search time budget in seconds")
+    parser.add_argument("-b", "--batch", type=str, default=None, help="directory or glob of testcases to solve")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of batch worker processes")
+    parser.add_argument("--stats", type=str, default=None, help="write phase times and counters as JSON")
+    parser.add_argument("--trace", type=str, default=None, help="write phase times as a Chrome trace")
+    parser.add_argument("--compact", action="store_true", help="use the array-backed graph (fcfs and random only)")
+    parser.add_argument("--stream", action="store_true", help="solve arrivals online and write committed zone orders")
+    parser.add_argument("--binary", action="store_true", help="write the schedule in the binary format to -o")
+    parser.add_argument("--lookahead", type=float, default=5.0, help="seconds before a streamed vehicle is committed")
+    parser.add_argument("--topology", type=str, default=None, help="intersection layout file")
+    parser.add_argument("--network", type=str, default=None, help="network file, -i trips and -o schedule directory")
+    parser.add_argument("--serve", type=str, default=None, help="serve reservations on unix:[path] or [host]:[port]")
+    parser.add_argument("--rounds", type=int, default=100, help="most network rounds before giving up on stability")
     args = parser.parse_args()
+    if args.compact and args.strategy not in ("fcfs", "random"):
+        parser.error("--compact only supports the fcfs and random strategies")
+    if (args.stats or args.trace) and (args.batch or args.compact or args.stream):
+        parser.error("--stats and --trace only apply to a single run")
+    if args.binary and (args.output is None or args.batch or args.stream):
+        parser.error("--binary needs -o and a single run")
+    if args.stream and args.input and is_binary(args.input):
+        parser.error("--stream reads text testcases")
+    if args.network and (args.output is None or args.batch or args.compact or args.stream or args.binary):
+        parser.error("--network needs -o and a single run")
     return args
 
 
 if __name__ == "__main__":
     args = parse_args()
-    input = open(args.input) if args.input else sys.stdin
-    output = open(args.output, "w") if args.output else sys.stdout
-
-    main(input, output, args.strategy)
-
-    if input != sys.stdin:
-        input.close()
-    if output != sys.stdout:
+    if args.topology is not None:
+        topology.load(args.topology)
+    if args.serve is not None:
+        try:
+            asyncio.run(serve(args.serve))
+        except KeyboardInterrupt:
+            pass
+        exit()
+    output = args.output if args.binary or args.network else open(args.output, "w") if args.output else sys.stdout
+
+    if args.network is not None:
+        with open(args.input) if args.input else sys.stdin as input:
+            summary = network(
+                args.network, input, output, args.strategy, args.horizon, args.budget, args.workers, args.rounds
+            )
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.batch is not None:
+        json.dump(batch(args.batch, args.workers, args.strategy, args.horizon, args.budget), output, indent=2)
+        output.write("\n")
+    else:
+        if args.input is None:
+            input = sys.stdin
+        else:
+            input = read_testcase(args.input) if is_binary(args.input) else open(args.input)
+        if args.compact:
+            main_compact(input, output, args.strategy, args.horizon)
+        elif args.stream:
+            stream(input, output, args.strategy, args.lookahead, args.horizon, args.budget)
+        else:
+            stats = Stats(bool(args.stats or args.trace))
+            main(input, output, args.strategy, args.horizon, args.budget, stats)
+            if args.stats:
+                with open(args.stats, "w") as file:
+                    json.dump(stats.summary(), file, indent=2)
+            if args.trace:
+                with open(args.trace, "w") as file:
+                    json.dump(stats.trace(), file)
+        if not isinstance(input, np.ndarray) and input != sys.stdin:
+            input.close()
+
+    if output != sys.stdout and not isinstance(output, str):
         output.close()
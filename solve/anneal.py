@@ -0,0 +1,77 @@
+from math import exp
+from random import random
+from time import perf_counter
+
+import numpy as np
+
+from rcg import RCG
+from tcg import TCG, TIME_CHANGE_ZONE
+from timing import Timing
+
+
+def anneal(tcg: TCG, rcg: RCG, timing: Timing, budget: float) -> tuple[float, float, int, int]:
+    # simulated annealing over type 3 edge orientations from a deadlock-free start,
+    # keep the orientation with the best makespan
+    # return makespan of the start, best makespan, number of accepted moves and of edges reversed
+    def flip(index: int):
+        nonlocal flips
+        flips += 1
+        edge = tcg.edges[index]
+        edge.reverse()
+        rcg.update([edge])
+        timing.reverse([index])
+
+    def holding(indices: np.ndarray) -> np.ndarray:
+        # only a conflict holding back its end node can shorten the schedule
+        src, dst = timing.src[indices], timing.dst[indices]
+        return conflict[indices] & np.isclose(time[dst], time[src] + timing.weight[indices])
+
+    conflict = np.array([edge.type == 3 for edge in tcg.edges], dtype=bool)
+    time = timing.evaluate()
+    start = current = best = timing.makespan(time)
+    orientation = timing.src.copy()
+    moves = flips = 0
+    # tight conflicts and the position of each one in the list, -1 if not tight,
+    # a move only changes the edges at the nodes whose time it changes and the flipped edge
+    tight = np.flatnonzero(holding(np.arange(len(tcg.edges)))).tolist()
+    slot = np.full(len(tcg.edges), -1, dtype=np.int64)
+    slot[tight] = np.arange(len(tight))
+
+    begin = perf_counter()
+    while (elapsed := perf_counter() - begin) < budget:
+        if not tight:
+            break
+        index = tight[int(random() * len(tight))]
+        flip(index)
+        # keep deadlock and timing in step with the move, only downstream of the edge is recomputed
+        changed = None if rcg.has_deadlock() else timing.evaluate(time, [timing.src[index], timing.dst[index]])
+        if changed is None:
+            flip(index)
+            continue
+        makespan = timing.makespan(changed)
+        temperature = TIME_CHANGE_ZONE * (1 - elapsed / budget)
+        if makespan <= current or random() < exp((current - makespan) / temperature):
+            indices = np.unique(np.append(timing.edges_at(np.flatnonzero(changed != time)), index))
+            time, current = changed, makespan
+            for k, now in zip(indices.tolist(), holding(indices).tolist()):
+                if now and slot[k] < 0:
+                    slot[k] = len(tight)
+                    tight.append(k)
+                elif not now and slot[k] >= 0:
+                    # move the last one into its place
+                    last = tight.pop()
+                    if last != k:
+                        tight[slot[k]] = last
+                        slot[last] = slot[k]
+                    slot[k] = -1
+            moves += 1
+            if makespan < best:
+                best = makespan
+                orientation = timing.src.copy()
+        else:
+            flip(index)
+
+    # go back to the best orientation
+    for index in np.flatnonzero(timing.src != orientation).tolist():
+        flip(index)
+    return start, best, moves, flips
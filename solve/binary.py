@@ -0,0 +1,125 @@
+import sys
+
+import numpy as np
+
+# testcase: 16 byte header (magic, version, number of vehicles), then fixed-width records
+# schedule: 16 byte header (magic, version, number of zones), zones + 1 offsets into the vehicle ids, then the ids
+# all little-endian, readable in place with numpy.memmap
+TESTCASE_MAGIC = b"IIVT"
+SCHEDULE_MAGIC = b"IIVS"
+VERSION = 1
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("count", "<u8")])
+RECORD = np.dtype([("id", "<i8"), ("arrive", "<i8"), ("start", "<i4"), ("end", "<i4"), ("payment", "<i8")])
+COLUMNS = ["id", "arrive", "start", "end", "payment"]
+# lines converted at once
+CHUNK = 1 << 20
+
+
+def is_binary(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(4) in (TESTCASE_MAGIC, SCHEDULE_MAGIC)
+
+
+def header(path: str, magic: bytes) -> int:
+    head = np.fromfile(path, dtype=HEADER, count=1)
+    if len(head) == 0 or head["magic"][0] != magic or head["version"][0] != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} {magic.decode()} file")
+    return int(head["count"][0])
+
+
+class TestcaseWriter:
+    # append records chunk by chunk, the vehicle count in the header is written on close
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.count = 0
+        self.file.write(np.zeros(1, dtype=HEADER).tobytes())
+
+    def write(self, rows: np.ndarray):
+        # rows of id, arrive, start, end and optionally payment
+        records = np.zeros(len(rows), dtype=RECORD)
+        for k in range(rows.shape[1]):
+            records[COLUMNS[k]] = rows[:, k]
+        self.file.write(records.tobytes())
+        self.count += len(rows)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(np.array([(TESTCASE_MAGIC, VERSION, self.count)], dtype=HEADER).tobytes())
+        self.file.close()
+
+
+def read_testcase(path: str) -> np.ndarray:
+    # records of a binary testcase, mapped without reading them
+    count = header(path, TESTCASE_MAGIC)
+    if count == 0:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(count,))
+
+
+def write_schedule(path: str, zones: list[list[int]]):
+    offsets = np.cumsum([0] + [len(zone) for zone in zones], dtype="<u8")
+    with open(path, "wb") as f:
+        f.write(np.array([(SCHEDULE_MAGIC, VERSION, len(zones))], dtype=HEADER).tobytes())
+        f.write(offsets.tobytes())
+        for zone in zones:
+            f.write(np.asarray(zone, dtype="<i8").tobytes())
+
+
+def read_schedule(path: str) -> list[np.ndarray]:
+    # vehicle ids of each zone, mapped without reading them
+    zones = header(path, SCHEDULE_MAGIC)
+    offsets = np.fromfile(path, dtype="<u8", count=zones + 1, offset=HEADER.itemsize).tolist()
+    if offsets[-1] == 0:
+        return [np.zeros(0, dtype="<i8") for _ in range(zones)]
+    begin = HEADER.itemsize + (zones + 1) * 8
+    vids = np.memmap(path, dtype="<i8", mode="r", offset=begin, shape=(offsets[-1],))
+    return [vids[offsets[k] : offsets[k + 1]] for k in range(zones)]
+
+
+def testcase_to_binary(text: str, path: str):
+    writer = TestcaseWriter(path)
+    with open(text) as f:
+        while lines := f.readlines(CHUNK):
+            columns = len(lines[0].split())
+            writer.write(np.array("".join(lines).split(), dtype=np.int64).reshape(-1, columns))
+    writer.close()
+
+
+def testcase_to_text(path: str, text: str, payment: bool = False):
+    records = read_testcase(path)
+    columns = COLUMNS if payment else COLUMNS[:4]
+    line = " ".join(["%d"] * len(columns)) + "\n"
+    with open(text, "w") as f:
+        for begin in range(0, len(records), CHUNK):
+            chunk = records[begin : begin + CHUNK]
+            rows = np.stack([chunk[name].astype(np.int64) for name in columns], axis=1)
+            f.write(line * len(chunk) % tuple(rows.ravel().tolist()))
+
+
+def schedule_to_binary(text: str, path: str):
+    with open(text) as f:
+        write_schedule(path, [np.array(line.split(), dtype=np.int64) for line in f])
+
+
+def schedule_to_text(path: str, text: str):
+    with open(text, "w") as f:
+        for zone in read_schedule(path):
+            f.write(" ".join(map(str, zone.tolist())) + "\n")
+
+
+if __name__ == "__main__":
+    # convert a testcase or a schedule to the other format
+    args = sys.argv[1:]
+    if len(args) < 3 or args[0] not in ("testcase", "schedule"):
+        exit("Usage: python binary.py testcase|schedule <input> <output> [--payment]")
+    kind, input, output = args[:3]
+    if kind == "testcase":
+        if is_binary(input):
+            testcase_to_text(input, output, "--payment" in args)
+        else:
+            testcase_to_binary(input, output)
+    else:
+        if is_binary(input):
+            schedule_to_text(input, output)
+        else:
+            schedule_to_binary(input, output)
@@ -0,0 +1,252 @@
+from random import random
+from typing import TextIO
+
+import numpy as np
+
+from path import topology
+
+
+def tables() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # topology lookup tables as arrays: route of each start and end, zones of each route padded with -1,
+    # their number, route conflicts and zones shared from the start
+    routes = topology.routes
+    zones = np.full((len(routes), max(map(len, routes))), -1, dtype=np.int64)
+    for k, route in enumerate(routes):
+        zones[k, : len(route)] = route
+    return (
+        np.array(topology.route, dtype=np.int64),
+        zones,
+        (zones >= 0).sum(axis=1),
+        np.array(topology.conflict, dtype=bool),
+        np.array(topology.shared, dtype=np.int64),
+    )
+
+
+def topological(n: int, src: np.ndarray, dst: np.ndarray, stamp: np.ndarray) -> np.ndarray:
+    # first-in-first-out Kahn's algorithm over the edges sorted by start and stamp,
+    # return nodes in the order they leave the queue, fewer than n if the graph has a cycle
+    order = np.lexsort((stamp, src))
+    offsets = np.searchsorted(src[order], np.arange(n + 1)).tolist()
+    targets = dst[order].tolist()
+    in_degree = np.bincount(dst, minlength=n)
+    queue = np.flatnonzero(in_degree == 0).tolist()
+    in_degree = in_degree.tolist()
+    # the queue grows while it is walked
+    for node in queue:
+        for k in range(offsets[node], offsets[node + 1]):
+            other = targets[k]
+            in_degree[other] -= 1
+            if in_degree[other] == 0:
+                queue.append(other)
+    return np.array(queue, dtype=np.int64)
+
+
+class CompactTCG:
+    # TCG with integer nodes and edges in arrays, nodes are numbered vehicle by vehicle along the path
+    # as tcg.nodes, edges are in the order of tcg.edges
+    def __init__(self, horizon: float | None = None):
+        # skip type 3 edges between vehicles arriving more than `horizon` apart
+        self.horizon = horizon
+        # per vehicle
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.arrive = np.zeros(0, dtype=np.int64)
+        self.start = np.zeros(0, dtype=np.int64)
+        self.end = np.zeros(0, dtype=np.int64)
+        self.route = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros(0, dtype=np.int64)  # first node of each vehicle
+        # per node
+        self.vehicle = np.zeros(0, dtype=np.int64)
+        self.vid = np.zeros(0, dtype=np.int64)
+        self.zid = np.zeros(0, dtype=np.int64)
+        # per edge, stamp orders the outgoing edges of a node like TCG_Node.outgoing
+        self.type = np.zeros(0, dtype=np.int64)
+        self.src = np.zeros(0, dtype=np.int64)
+        self.dst = np.zeros(0, dtype=np.int64)
+        self.stamp = np.zeros(0, dtype=np.int64)
+
+    def build(self, input: TextIO | np.ndarray):
+        prev = self.build_path(input)
+        types, srcs, dsts = [self.type], [self.src], [self.dst]
+        conflicts = tables()[3]
+        # type 3 edges zone by zone
+        for zid in range(len(topology.zones)):
+            nodes = np.flatnonzero(self.zid == zid)
+            if self.horizon is None:
+                last, fifo = self.fifo(nodes, prev)
+                i, j = np.triu_indices(len(nodes), 1)
+                conflict = conflicts[self.route[self.vehicle[nodes[i]]], self.route[self.vehicle[nodes[j]]]]
+                types.append(np.repeat([4, 3], [len(fifo), conflict.sum()]))
+                srcs.append(nodes[np.concatenate([last[fifo], j[conflict]])])
+                dsts.append(nodes[np.concatenate([fifo, i[conflict]])])
+            else:
+                type, src, dst = self.sparse(nodes, prev)
+                types.append(type)
+                srcs.append(src)
+                dsts.append(dst)
+        self.type = np.concatenate(types)
+        self.src = np.concatenate(srcs)
+        self.dst = np.concatenate(dsts)
+        self.stamp = np.arange(len(self.type))
+
+    def build_path(self, input: TextIO | np.ndarray) -> np.ndarray:
+        # nodes, type 1 and type 2 edges, return the previous vehicle of the same approach
+        # read the whole testcase at once, or take the columns of binary testcase records
+        if isinstance(input, np.ndarray):
+            data = np.stack([input[name].astype(np.int64) for name in ("id", "arrive", "start", "end")], axis=1)
+        else:
+            # a fifth column is the payment
+            text = input.read()
+            columns = len(text.split("\n", 1)[0].split()) if text.strip() else 4
+            data = np.array(text.split(), dtype=np.int64).reshape(-1, columns)[:, :4]
+        self.ids, self.arrive, self.start, self.end = data.T
+        routes, zones, lengths, _, shares = tables()
+        self.route = routes[self.start, self.end]
+        length = lengths[self.route]
+        self.first = np.cumsum(length) - length
+        self.vehicle = np.repeat(np.arange(len(data)), length)
+        step = np.arange(len(self.vehicle)) - self.first[self.vehicle]
+        self.vid = self.ids[self.vehicle]
+        self.zid = zones[self.route[self.vehicle], step]
+
+        # type 1 edges along each path, then type 2 edges from the previous vehicle of the same approach
+        inner = step < length[self.vehicle] - 1
+        src1 = np.flatnonzero(inner)
+        prev = self.previous(self.start, np.arange(len(data)))
+        shared = np.where(prev >= 0, shares[self.route, self.route[np.maximum(prev, 0)]], 0)
+        vehicle2 = np.repeat(np.arange(len(data)), shared)
+        step2 = np.arange(len(vehicle2)) - np.repeat(np.cumsum(shared) - shared, shared)
+        dst2 = self.first[vehicle2] + step2
+        src2 = self.first[prev[vehicle2]] + step2
+        phase = np.repeat([0, 1], [len(src1), len(dst2)])
+        order = np.lexsort((np.concatenate([step[src1], step2]), phase, np.concatenate([self.vehicle[src1], vehicle2])))
+        self.type = np.repeat([1, 2], [len(src1), len(dst2)])[order]
+        self.src = np.concatenate([src1, src2])[order]
+        self.dst = np.concatenate([src1 + 1, dst2])[order]
+        self.stamp = np.arange(len(self.type))
+        return prev
+
+    def previous(self, keys: np.ndarray, items: np.ndarray) -> np.ndarray:
+        # previous item with the same key, -1 for the first one
+        order = np.argsort(keys, kind="stable")
+        prev = np.full(len(items), -1, dtype=np.int64)
+        same = keys[order][1:] == keys[order][:-1]
+        prev[order[1:][same]] = items[order[:-1][same]]
+        return prev
+
+    def fifo(self, nodes: np.ndarray, prev: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # position of the last node of the same approach before each node of one zone, -1 for none,
+        # and the positions a type 4 edge links to it, where no type 2 edge does
+        vehicle = self.vehicle[nodes]
+        last = self.previous(self.start[vehicle], np.arange(len(nodes)))
+        fifo = np.flatnonzero(last >= 0)
+        before = vehicle[last[fifo]]
+        shared = tables()[4][self.route[vehicle[fifo]], self.route[before]]
+        step = nodes[fifo] - self.first[vehicle[fifo]]
+        return last, fifo[(prev[vehicle[fifo]] != before) | (step >= shared)]
+
+    def sparse(self, nodes: np.ndarray, prev: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # TCG.build_sparse_type_3_edge for the nodes of one zone, sorted by arrival time
+        m = len(nodes)
+        vehicle = self.vehicle[nodes]
+        route = self.route[vehicle]
+        arrive = self.arrive[vehicle]
+        hi = np.searchsorted(arrive, arrive + self.horizon, side="right")
+        # type 4 edge from the last node of the same approach unless a type 2 or a type 4 edge links them
+        last, fifo = self.fifo(nodes, prev)
+        fifo = fifo[hi[last[fifo]] != fifo]
+        # type 3 edges within the horizon
+        count = hi - np.arange(m) - 1
+        i = np.repeat(np.arange(m), count)
+        j = i + 1 + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        conflict = tables()[3][route[i], route[j]]
+        i, j = i[conflict], j[conflict]
+        # type 4 edge to the first node beyond the horizon
+        beyond = np.flatnonzero(hi < m)
+        src = np.concatenate([last[fifo], j, beyond])
+        dst = np.concatenate([fifo, i, hi[beyond]])
+        type = np.repeat([4, 3, 4], [len(fifo), len(i), len(beyond)])
+        phase = np.repeat([0, 1, 2], [len(fifo), len(i), len(beyond)])
+        order = np.lexsort((np.concatenate([fifo, j, beyond]), phase, np.concatenate([fifo, i, beyond])))
+        return type[order], nodes[src[order]], nodes[dst[order]]
+
+    def reverse(self, indices: np.ndarray):
+        # reverse edges by index, each one goes to the end of its new start's outgoing edges
+        self.src[indices], self.dst[indices] = self.dst[indices], self.src[indices]
+        self.stamp[indices] = self.stamp.max(initial=-1) + 1 + np.arange(len(indices))
+
+    def reduce(self):
+        # TCG.reduce: collapse each zone's type 3 and 4 edges to the chain of consecutive nodes
+        zones = self.schedule()
+        if sum(len(nodes) for nodes in zones) != len(self.vid):
+            return
+        keep = self.type < 3
+        self.type, self.src, self.dst, self.stamp = self.type[keep], self.src[keep], self.dst[keep], self.stamp[keep]
+        self.chain(zones)
+
+    def chain(self, zones: list[np.ndarray]):
+        # type 3 edges between consecutive nodes of each zone order
+        types, srcs, dsts, stamps = [self.type], [self.src], [self.dst], [self.stamp]
+        stamp = self.stamp.max(initial=-1) + 1
+        length = tables()[2][self.route]
+        for nodes in zones:
+            chain = (nodes[:-1], nodes[1:])
+            # a single-zone vehicle never holds a zone while waiting, so also chain the multi-zone nodes
+            multi = nodes[length[self.vehicle[nodes]] > 1]
+            successor = np.full(len(self.vid), -1, dtype=np.int64)
+            successor[chain[0]] = chain[1]
+            skip = successor[multi[:-1]] != multi[1:]
+            src = np.concatenate([chain[0], multi[:-1][skip]])
+            types.append(np.full(len(src), 3))
+            srcs.append(src)
+            dsts.append(np.concatenate([chain[1], multi[1:][skip]]))
+            stamps.append(stamp + np.arange(len(src)))
+            stamp += len(src)
+        self.type = np.concatenate(types)
+        self.src = np.concatenate(srcs)
+        self.dst = np.concatenate(dsts)
+        self.stamp = np.concatenate(stamps)
+
+    def solve(self, method: str) -> np.ndarray:
+        # return indices of reversed edges, only fcfs and random run on the array-backed graph
+        if method not in ("fcfs", "random"):
+            raise ValueError(f"the compact graph does not support the {method} strategy")
+        indices = np.flatnonzero((self.type == 3) & (self.vid[self.src] > self.vid[self.dst]))
+        if method == "random":
+            indices = indices[np.array([random() < 0.5 for _ in indices], dtype=bool)]
+        self.reverse(indices)
+        return indices
+
+    def schedule(self) -> list[np.ndarray]:
+        # per-zone nodes in the order of TCG.schedule
+        queue = topological(len(self.vid), self.src, self.dst, self.stamp)
+        return [queue[self.zid[queue] == zid] for zid in range(len(topology.zones))]
+
+    def has_deadlock(self) -> bool:
+        # the current orientation or its RCG has a cycle, single-zone nodes can close one no RCG node passes
+        if len(topological(len(self.vid), self.src, self.dst, self.stamp)) < len(self.vid):
+            return True
+        first, rsrc, rdst = self.rcg()
+        return len(topological(len(first), rsrc, rdst, np.arange(len(rsrc)))) < len(first)
+
+    def rcg(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # RCG nodes are the type 1 edges, return them and the RCG edges between them
+        first = np.flatnonzero(self.type == 1)
+        starts = np.full(len(self.vid), -1, dtype=np.int64)
+        ends = np.full(len(self.vid), -1, dtype=np.int64)
+        starts[self.src[first]] = np.arange(len(first))
+        ends[self.dst[first]] = np.arange(len(first))
+        same = self.vehicle[self.src] == self.vehicle[self.dst]
+        src, dst = self.src[~same], self.dst[~same]
+        pairs = [
+            (starts[self.src], starts[self.dst]),  # type a and b
+            (ends[src], ends[dst]),  # type c
+            (starts[src], ends[dst]),  # type d
+            (ends[src], starts[dst]),  # type e
+        ]
+        rsrc = np.concatenate([i for i, _ in pairs])
+        rdst = np.concatenate([j for _, j in pairs])
+        valid = (rsrc >= 0) & (rdst >= 0)
+        return first, rsrc[valid], rdst[valid]
+
+    def __repr__(self):
+        return f"TCG({len(self.ids)} vehicles, {len(self.vid)} nodes, {len(self.type)} edges)"
@@ -0,0 +1,267 @@
+from time import perf_counter
+
+from path import topology
+from rcg import RCG
+from tcg import TCG, TIME_CHANGE_ZONE, TIME_ENTER_ZONE, TIME_WAIT
+from timing import Timing
+
+
+class Exact:
+    # branch and bound over dispatch orders of the TCG nodes,
+    # each order fixes the type 3 edges between a dispatched node and the rest of its zone
+    def __init__(self, tcg: TCG, budget: float):
+        self.tcg = tcg
+        self.budget = budget
+        index = {node: i for i, node in enumerate(tcg.nodes)}
+        n = len(tcg.nodes)
+        self.release = [tcg.vehicles[node.vid].arrive_time + TIME_ENTER_ZONE for node in tcg.nodes]
+        # type 1, 2 and 4 edges are fixed, type 3 edges are decided by the search
+        self.preds: list[list[tuple[int, float]]] = [[] for _ in range(n)]
+        self.succs: list[list[int]] = [[] for _ in range(n)]
+        self.partners: list[list[int]] = [[] for _ in range(n)]
+        for edge in tcg.edges:
+            i, j = index[edge.start], index[edge.end]
+            if edge.type == 3:
+                self.partners[i].append(j)
+                self.partners[j].append(i)
+            else:
+                self.preds[j].append((i, TIME_CHANGE_ZONE if edge.type == 1 else TIME_CHANGE_ZONE + TIME_WAIT))
+                self.succs[i].append(j)
+        # time from entering a node until the vehicle leaves the intersection
+        self.tail = [0.0] * n
+        for vehicle in tcg.vehicles:
+            for k, node in enumerate(vehicle.path):
+                self.tail[index[node]] = (len(vehicle.path) - k) * TIME_CHANGE_ZONE
+        self.last = [tcg.vehicles[node.vid].path[-1] is node for node in tcg.nodes]
+
+        # per zone, nodes with pairwise separated enter times:
+        # a chain of type 2 edges for each approach, type 3 edges between approaches
+        self.cliques: list[list[int]] = []
+        for zid in range(len(topology.zones)):
+            chains: dict[int, list[int]] = {}
+            for i, node in enumerate(tcg.nodes):
+                if node.zid != zid:
+                    continue
+                chain = chains.setdefault(tcg.vehicles[node.vid].start, [])
+                if not chain or any(p == chain[-1] for p, _ in self.preds[i]):
+                    chain.append(i)
+            clique = [i for chain in chains.values() for i in chain]
+            start = {i: tcg.vehicles[tcg.nodes[i].vid].start for i in clique}
+            partners = {i: set(self.partners[i]) for i in clique}
+            if all(j in partners[i] for i in clique for j in clique if start[i] != start[j]):
+                self.cliques.append(clique)
+
+        # topological order of the fixed edges
+        self.waiting = [len(preds) for preds in self.preds]
+        self.topological = [i for i in range(n) if self.waiting[i] == 0]
+        in_degree = self.waiting[:]
+        for i in self.topological:
+            for j in self.succs[i]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    self.topological.append(j)
+
+        # RCG of the fixed edges, type 3 edges are linked when the first end is dispatched
+        self.rcg = RCG()
+        self.rcg.build(tcg)
+        for edge in tcg.edges:
+            if edge.type == 3:
+                self.rcg.unlink(edge.start, edge.end)
+        self.rcg.insert()
+        # TCG node indices at both ends of each RCG node
+        self.rcg_index = {node: r for r, node in enumerate(self.rcg.nodes)}
+        self.rcg_start = [0] * len(self.rcg.nodes)
+        self.rcg_end = [0] * len(self.rcg.nodes)
+        for node, rs in self.rcg.starts.items():
+            for r in rs:
+                self.rcg_start[r] = index[node]
+        for node, rs in self.rcg.ends.items():
+            for r in rs:
+                self.rcg_end[r] = index[node]
+
+        self.time = [0.0] * n
+        self.dispatched = [False] * n
+        self.zones: list[list[int]] = [[] for _ in topology.zones]
+        self.memo: dict[tuple, list[tuple[tuple[float, ...], float]]] = {}
+        self.best = float("inf")
+        self.schedule: list[list[int]] | None = None
+        self.stats = {"nodes": 0, "bound": 0, "deadlock": 0, "memo": 0, "proven": True, "time": 0.0, "reversed": 0}
+
+    def bound(self, makespan: float) -> float:
+        # longest path with the undecided type 3 edges left out
+        est = self.time[:]
+        lower = makespan
+        for y in self.topological:
+            if self.dispatched[y]:
+                continue
+            t = self.release[y]
+            for p, w in self.preds[y]:
+                t = max(t, est[p] + w)
+            for q in self.partners[y]:
+                if self.dispatched[q]:
+                    t = max(t, self.time[q] + TIME_CHANGE_ZONE + TIME_WAIT)
+            est[y] = t
+            lower = max(lower, t + self.tail[y])
+        # nodes of a clique enter one at a time, so any subset of them takes
+        # its earliest enter time, a separation per node and its shortest tail
+        separation = TIME_CHANGE_ZONE + TIME_WAIT
+        for clique in self.cliques:
+            jobs = sorted((est[y], self.tail[y]) for y in clique if not self.dispatched[y])
+            tail = float("inf")
+            for k in range(len(jobs) - 1, -1, -1):
+                tail = min(tail, jobs[k][1])
+                lower = max(lower, jobs[k][0] + (len(jobs) - 1 - k) * separation + tail)
+            jobs.sort(key=lambda job: job[1], reverse=True)
+            enter = float("inf")
+            for k, (t, tail) in enumerate(jobs):
+                enter = min(enter, t)
+                lower = max(lower, enter + k * separation + tail)
+        return lower
+
+    def state(self) -> tuple[tuple, tuple[float, ...]]:
+        # what the rest of the search can see of the dispatch order so far:
+        # the dispatched nodes, RCG reachability from the vehicles halfway through a zone change
+        # to RCG nodes not done yet, and enter times of dispatched nodes with edges to the rest
+        dispatched = self.dispatched
+        reach: list[tuple[int, ...]] = []
+        for r, node in enumerate(self.rcg.nodes):
+            if not dispatched[self.rcg_start[r]] or dispatched[self.rcg_end[r]]:
+                continue
+            visited = {node}
+            stack = [node]
+            while stack:
+                for edge in stack.pop().outgoing:
+                    if edge.end not in visited:
+                        visited.add(edge.end)
+                        stack.append(edge.end)
+            reached = [self.rcg_index[other] for other in visited if other is not node]
+            reach.append((r, *sorted(other for other in reached if not dispatched[self.rcg_end[other]])))
+        frontier = [
+            i
+            for i, done in enumerate(dispatched)
+            if done
+            and (any(not dispatched[j] for j in self.succs[i]) or any(not dispatched[j] for j in self.partners[i]))
+        ]
+        return (tuple(dispatched), tuple(reach)), tuple(self.time[i] for i in frontier)
+
+    def enter(self, x: int) -> float:
+        # enter time of x if it is dispatched next
+        t = self.release[x]
+        for p, w in self.preds[x]:
+            t = max(t, self.time[p] + w)
+        for q in self.partners[x]:
+            if self.dispatched[q]:
+                t = max(t, self.time[q] + TIME_CHANGE_ZONE + TIME_WAIT)
+        return t
+
+    def dispatch(self, x: int) -> bool:
+        # orient type 3 edges of x towards the rest of its zone, False if that deadlocks
+        nodes = self.tcg.nodes
+        others = [q for q in self.partners[x] if not self.dispatched[q]]
+        for q in others:
+            self.rcg.link(nodes[x], nodes[q])
+        self.rcg.insert()
+        if self.rcg.has_deadlock():
+            for q in others:
+                self.rcg.unlink(nodes[x], nodes[q])
+            self.rcg.insert()
+            return False
+        self.time[x] = self.enter(x)
+        self.dispatched[x] = True
+        self.zones[nodes[x].zid].append(x)
+        for j in self.succs[x]:
+            self.waiting[j] -= 1
+        return True
+
+    def undo(self, x: int):
+        nodes = self.tcg.nodes
+        for j in self.succs[x]:
+            self.waiting[j] += 1
+        self.zones[nodes[x].zid].pop()
+        self.dispatched[x] = False
+        for q in self.partners[x]:
+            if not self.dispatched[q]:
+                self.rcg.unlink(nodes[x], nodes[q])
+        self.rcg.insert()
+
+    def expand(self, makespan: float) -> list[int]:
+        # nodes to dispatch next, latest first, empty if the state is a leaf or pruned
+        self.stats["nodes"] += 1
+        if len(self.tcg.nodes) == sum(len(zone) for zone in self.zones):
+            if makespan < self.best:
+                self.best = makespan
+                self.schedule = [zone[:] for zone in self.zones]
+            return []
+        if self.bound(makespan) >= self.best - 1e-9:
+            self.stats["bound"] += 1
+            return []
+        # skip the state if one with the same future was reached no later
+        key, times = self.state()
+        entries = self.memo.setdefault(key, [])
+        for other, other_makespan in entries:
+            if other_makespan <= makespan and all(a <= b for a, b in zip(other, times)):
+                self.stats["memo"] += 1
+                return []
+        entries[:] = [
+            (other, other_makespan)
+            for other, other_makespan in entries
+            if not (makespan <= other_makespan and all(a <= b for a, b in zip(times, other)))
+        ]
+        entries.append((times, makespan))
+        ready = [i for i, waiting in enumerate(self.waiting) if waiting == 0 and not self.dispatched[i]]
+        return sorted(ready, key=lambda i: (self.enter(i), i), reverse=True)
+
+    def solve(self, upper: float = float("inf")) -> list[list[int]] | None:
+        # return per-zone node indices of the best schedule below upper, None if there is none
+        self.best = upper
+        begin = perf_counter()
+        zid = [node.zid for node in self.tcg.nodes]
+        # each frame is (dispatched node, makespan so far, nodes left to try, sleep set),
+        # nodes in the sleep set were tried by an earlier sibling and commute with the dispatches since,
+        # so every order of the zones is visited once
+        stack: list[tuple[int, float, list[int], set[int]]] = [(-1, 0.0, self.expand(0.0), set())]
+        while stack:
+            if perf_counter() - begin > self.budget:
+                self.stats["proven"] = False
+                break
+            x, makespan, ready, sleep = stack[-1]
+            if not ready:
+                stack.pop()
+                if x >= 0:
+                    self.undo(x)
+                continue
+            y = ready.pop()
+            if y in sleep:
+                continue
+            if not self.dispatch(y):
+                self.stats["deadlock"] += 1
+                continue
+            child = max(makespan, self.time[y] + TIME_CHANGE_ZONE) if self.last[y] else makespan
+            stack.append((y, child, self.expand(child), {i for i in sleep if zid[i] != zid[y]}))
+            sleep.add(y)
+        self.stats["time"] = perf_counter() - begin
+        return self.schedule
+
+
+def exact(tcg: TCG, rcg: RCG, timing: Timing, budget: float) -> tuple[float, float, dict]:
+    # optimal makespan within the time budget, start from the current deadlock-free orientation
+    # return makespan of the start, best makespan and proof statistics
+    start = timing.makespan(timing.evaluate())
+    search = Exact(tcg, budget)
+    schedule = search.solve(start)
+    if schedule is None:
+        return start, start, search.stats
+    # orient type 3 edges by the zone orders of the best schedule
+    position = {}
+    for zone in schedule:
+        for k, i in enumerate(zone):
+            position[tcg.nodes[i]] = k
+    indices = [
+        index for index, edge in enumerate(tcg.edges) if edge.type == 3 and position[edge.start] > position[edge.end]
+    ]
+    for index in indices:
+        tcg.edges[index].reverse()
+    rcg.update([tcg.edges[index] for index in indices])
+    timing.reverse(indices)
+    search.stats["reversed"] = len(indices)
+    return start, search.best, search.stats
@@ -0,0 +1,66 @@
+import json
+import os
+from typing import TextIO
+
+from path import DEFAULT, Topology
+from tcg import TIME_CHANGE_ZONE, TIME_ENTER_ZONE
+
+
+class Network:
+    # intersections, each with its own topology, and links from an exit of one to an approach of another
+    def __init__(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        directory = os.path.dirname(os.path.abspath(path))
+        self.names: list[str] = []
+        self.topologies: list[str] = []
+        for k, intersection in enumerate(data["intersections"]):
+            self.names.append(intersection.get("name", f"intersection{k}"))
+            topology = intersection.get("topology")
+            self.topologies.append(DEFAULT if topology is None else os.path.join(directory, topology))
+        layouts = {path: Topology(path) for path in set(self.topologies)}
+        self.layouts = [layouts[path] for path in self.topologies]
+        # (intersection, exit) -> (intersection, approach, travel time)
+        self.links: dict[tuple[int, int], tuple[int, int, float]] = {}
+        # intersections feeding each intersection
+        self.upstream: list[set[int]] = [set() for _ in self.names]
+        for link in data["links"]:
+            source, exit, target, approach = link["from"], link["exit"], link["to"], link["approach"]
+            if not (
+                0 <= exit < len(self.layouts[source].exits) and 0 <= approach < len(self.layouts[target].approaches)
+            ):
+                raise ValueError(f"{path}: link from exit {exit} of {source} to approach {approach} of {target}")
+            if (source, exit) in self.links:
+                raise ValueError(f"{path}: more than one link from exit {exit} of {source}")
+            self.links[(source, exit)] = (target, approach, link.get("time", 0.0))
+            if source != target:
+                self.upstream[target].add(source)
+
+    def hops(self, intersection: int, start: int, ends: list[int]) -> list[tuple[int, int, int, float]]:
+        # (intersection, approach, exit, travel time from the previous one) of each intersection on a trip
+        hops = []
+        travel = 0.0
+        for k, end in enumerate(ends):
+            layout = self.layouts[intersection]
+            if layout.route_of(start, end) == len(layout.routes) - 1:
+                raise ValueError(f"no route from approach {start} to exit {end} of {self.names[intersection]}")
+            hops.append((intersection, start, end, travel))
+            if k + 1 < len(ends):
+                if (intersection, end) not in self.links:
+                    raise ValueError(f"no link from exit {end} of {self.names[intersection]}")
+                intersection, start, travel = self.links[(intersection, end)]
+        return hops
+
+    def free(self, intersection: int, start: int, end: int) -> float:
+        # time from arriving at an intersection to leaving it without waiting
+        layout = self.layouts[intersection]
+        return TIME_ENTER_ZONE + len(layout.routes[layout.route_of(start, end)]) * TIME_CHANGE_ZONE
+
+
+def read_trips(input: TextIO) -> list[tuple[int, int, int, int, list[int]]]:
+    # id, arrive, first intersection, approach, then the exit taken at each intersection
+    trips = []
+    for line in input:
+        id, arrive, intersection, start, *ends = map(int, line.split())
+        trips.append((id, arrive, intersection, start, ends))
+    return trips
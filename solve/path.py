@@ -1,33 +1,69 @@
-path_map = {
-    0: {
-        0: [0],
-        1: [0, 1],
-        2: [0, 1, 2],
-        3: [0, 1, 2, 3],
-    },
-    1: {
-        0: [1, 2, 3, 0],
-        1: [1],
-        2: [1, 2],
-        3: [1, 2, 3],
-    },
-    2: {
-        0: [2, 3, 0],
-        1: [2, 3, 0, 1],
-        2: [2],
-        3: [2, 3],
-    },
-    3: {
-        0: [3, 0],
-        1: [3, 0, 1],
-        2: [3, 0, 1, 2],
-        3: [3],
-    },
-}
+import json
+import os
+
+# four zones, one approach and one exit per zone
+DEFAULT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "topology", "default.json")
+
+
+class Topology:
+    # intersection layout compiled into lookup tables, a testcase's start is an approach and its end an exit
+    def __init__(self, path: str = DEFAULT):
+        self.load(path)
+
+    def load(self, path: str):
+        # replace the tables in place, modules keep a reference to the same object
+        with open(path) as f:
+            data = json.load(f)
+        self.path = path
+        self.size: tuple[int, int] = tuple(data.get("size", (600, 600)))
+        self.zones: list[dict] = data["zones"]  # geometry: pos
+        self.approaches: list[dict] = data["approaches"]  # entry zone, geometry: spawn, queue
+        self.exits: list[dict] = data["exits"]  # leaving zone, geometry: pos
+        self.lines: list[list[list[int]]] = data.get("lines", [])
+        # zones of each route, the last one is empty for a start and an end without a route
+        self.routes: list[list[int]] = [route["zones"] for route in data["routes"]] + [[]]
+        self.u_turn: list[bool] = [route.get("u_turn", False) for route in data["routes"]] + [False]
+        # approach of each route, vehicles of an approach keep first-in-first-out order
+        self.approach: list[int] = [route["approach"] for route in data["routes"]] + [-1]
+        empty = len(self.routes) - 1
+        self.route: list[list[int]] = [[empty] * len(self.exits) for _ in self.approaches]
+        for k, route in enumerate(data["routes"]):
+            zones, start, end = route["zones"], route["approach"], route["exit"]
+            if self.route[start][end] != empty:
+                raise ValueError(f"{path}: more than one route from approach {start} to exit {end}")
+            if not zones or any(not 0 <= zid < len(self.zones) for zid in zones):
+                raise ValueError(f"{path}: route from approach {start} to exit {end} has an unknown zone")
+            if zones[0] != self.approaches[start]["zone"] or zones[-1] != self.exits[end]["zone"]:
+                raise ValueError(f"{path}: route from approach {start} to exit {end} does not join them")
+            self.route[start][end] = k
+        # routes crossing a common zone from different approaches, their vehicles need a type 3 edge there
+        cover = [set(zones) for zones in self.routes]
+        self.conflict: list[list[bool]] = [
+            [
+                self.approach[i] != self.approach[j] and not cover[i].isdisjoint(cover[j])
+                for j in range(len(self.routes))
+            ]
+            for i in range(len(self.routes))
+        ]
+        # zones two routes of the same approach share from the start, their vehicles keep the order there
+        self.shared: list[list[int]] = [[0] * len(self.routes) for _ in self.routes]
+        for i, zones1 in enumerate(self.routes):
+            for j, zones2 in enumerate(self.routes):
+                if self.approach[i] != self.approach[j]:
+                    continue
+                for zid1, zid2 in zip(zones1, zones2):
+                    if zid1 != zid2:
+                        break
+                    self.shared[i][j] += 1
+
+    def route_of(self, start: int, end: int) -> int:
+        if 0 <= start < len(self.approaches) and 0 <= end < len(self.exits):
+            return self.route[start][end]
+        return len(self.routes) - 1
+
+
+topology = Topology()
 
 
 def get_path(start, end):
-    try:
-        return path_map[start][end]
-    except KeyError:
-        return []
+    return topology.routes[topology.route_of(start, end)]
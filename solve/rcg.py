@@ -0,0 +1,254 @@
+from enum import Enum
+
+from tcg import TCG, TCG_Edge, TCG_Node
+
+
+class Color(Enum):
+    WHITE = 0  # unvisited
+    GRAY = 1  # visited
+    BLACK = 2  # finished
+
+
+class RCG_Node:
+    def __init__(self, vid: int, start: int, end: int):
+        self.vid = vid
+        self.start = start
+        self.end = end
+        self.color = Color.WHITE
+        self.order = 0  # position in topological order
+        # insertion ordered like TCG_Node.outgoing, edges hash by identity so unlink takes constant time
+        self.outgoing: dict["RCG_Edge", None] = {}
+        self.incoming: dict["RCG_Edge", None] = {}
+
+    def link_to(self, other: "RCG_Node", via: tuple[TCG_Node, TCG_Node]):
+        edge = RCG_Edge(self, other, via)
+        self.outgoing[edge] = None
+        other.incoming[edge] = None
+        return edge
+
+    def unlink(self, edge: "RCG_Edge"):
+        del self.outgoing[edge]
+        del edge.end.incoming[edge]
+
+    def __repr__(self):
+        return f"({self.vid}, {self.start}, {self.end})"
+
+
+class RCG_Edge:
+    def __init__(self, start: "RCG_Node", end: "RCG_Node", via: tuple[TCG_Node, TCG_Node]):
+        self.start = start
+        self.end = end
+        self.via = via  # TCG nodes of the causing TCG edge
+
+    def __repr__(self):
+        return f"RCGE({self.start} → {self.end})"
+
+
+class RCG:
+    def __init__(self):
+        self.nodes: list[RCG_Node] = []
+        # edges by (start, end, via), each pair of RCG nodes has at most one edge per TCG edge
+        self.edges: dict[tuple[RCG_Node, RCG_Node, tuple[TCG_Node, TCG_Node]], RCG_Edge] = {}
+        # RCG nodes starting or ending at each TCG node
+        self.starts: dict[TCG_Node, list[int]] = {}
+        self.ends: dict[TCG_Node, list[int]] = {}
+        # number of TCG edges between each pair of TCG nodes
+        self.support: dict[tuple[TCG_Node, TCG_Node], int] = {}
+        # edges left out of the topological order, each one closes a cycle
+        self.pending: dict[RCG_Edge, None] = {}
+        self.visits = 0  # nodes visited by the searches so far
+
+    def build(self, tcg: TCG):
+        self.add(tcg)
+        self.sort()
+
+    def add(self, tcg: TCG):
+        # create RCG nodes from TCG type 1 edges
+        for edge in tcg.edges:
+            if edge.type == 1:
+                self.starts.setdefault(edge.start, []).append(len(self.nodes))
+                self.ends.setdefault(edge.end, []).append(len(self.nodes))
+                node = RCG_Node(edge.start.vid, edge.start.zid, edge.end.zid)
+                self.nodes.append(node)
+        for edge in tcg.edges:
+            key = (edge.start, edge.end)
+            self.support[key] = self.support.get(key, 0) + 1
+
+        # create RCG edges from TCG edges,
+        # sort by (start, end, type) to keep the order of the pairwise construction
+        links = [(*link, key) for key in self.support for link in self.links(*key)]
+        for i, j, _, key in sorted(links, key=lambda link: link[:3]):
+            self.edges[(self.nodes[i], self.nodes[j], key)] = self.nodes[i].link_to(self.nodes[j], key)
+
+    def sort(self):
+        # iterative DFS, the reverse postorder is a topological order except for back edges
+        postorder: list[RCG_Node] = []
+        for root in self.nodes:
+            if root.color != Color.WHITE:
+                continue
+            self.visits += 1
+            root.color = Color.GRAY
+            stack = [(root, iter(root.outgoing))]
+            while stack:
+                node, edges = stack[-1]
+                for edge in edges:
+                    if edge.end.color == Color.WHITE:
+                        self.visits += 1
+                        edge.end.color = Color.GRAY
+                        stack.append((edge.end, iter(edge.end.outgoing)))
+                        break
+                    if edge.end.color == Color.GRAY:
+                        # back edge closes a cycle
+                        self.pending[edge] = None
+                else:
+                    node.color = Color.BLACK
+                    postorder.append(node)
+                    stack.pop()
+        for order, node in enumerate(reversed(postorder)):
+            node.order = order
+
+    def links(self, start: TCG_Node, end: TCG_Node) -> list[tuple[int, int, int]]:
+        # RCG edges (index, index, type) caused by a TCG edge
+        starts1, ends1 = self.starts.get(start, []), self.ends.get(start, [])
+        starts2, ends2 = self.starts.get(end, []), self.ends.get(end, [])
+        if start.vid == end.vid:
+            # type a
+            return [(i, j, 0) for i in starts1 for j in starts2]
+        return (
+            [(i, j, 0) for i in starts1 for j in starts2]  # type b
+            + [(i, j, 1) for i in ends1 for j in ends2]  # type c
+            + [(i, j, 2) for i in starts1 for j in ends2]  # type d
+            + [(i, j, 3) for i in ends1 for j in starts2]  # type e
+        )
+
+    def update(self, edges: list[TCG_Edge]):
+        # apply TCG edges reversed since the last build or update
+        for tcg_edge in edges:
+            self.unlink(tcg_edge.end, tcg_edge.start)
+            self.link(tcg_edge.start, tcg_edge.end)
+        # removing edges keeps the order valid but may break cycles, so retry all pending edges
+        self.insert()
+
+    def link(self, start: TCG_Node, end: TCG_Node):
+        # add a TCG edge, its RCG edges stay pending until insert()
+        key = (start, end)
+        self.support[key] = self.support.get(key, 0) + 1
+        if self.support[key] == 1:
+            for i, j, _ in self.links(start, end):
+                edge = self.nodes[i].link_to(self.nodes[j], key)
+                self.edges[(self.nodes[i], self.nodes[j], key)] = edge
+                self.pending[edge] = None
+
+    def unlink(self, start: TCG_Node, end: TCG_Node):
+        # remove a TCG edge
+        key = (start, end)
+        self.support[key] -= 1
+        if self.support[key] == 0:
+            del self.support[key]
+            for i, j, _ in self.links(start, end):
+                edge = self.edges.pop((self.nodes[i], self.nodes[j], key))
+                self.nodes[i].unlink(edge)
+                self.pending.pop(edge, None)
+
+    def insert(self):
+        # move pending edges into the topological order
+        for edge in list(self.pending):
+            del self.pending[edge]
+            if not self.reorder(edge):
+                self.pending[edge] = None
+
+    def reorder(self, edge: RCG_Edge) -> bool:
+        # Pearce-Kelly: shift the affected region so that edge follows the order,
+        # return False if edge closes a cycle
+        lower, upper = edge.end.order, edge.start.order
+        if lower < upper:
+            forward = self.search(edge.end, upper, True)
+            if forward is None:
+                return False
+            backward = self.search(edge.start, lower, False)
+            nodes = sorted(backward, key=lambda node: node.order) + sorted(forward, key=lambda node: node.order)
+            orders = sorted(node.order for node in nodes)
+            for node, order in zip(nodes, orders):
+                node.order = order
+        return True
+
+    def search(self, node: RCG_Node, bound: int, forward: bool) -> list[RCG_Node] | None:
+        # nodes reachable from node between node and bound in the order, None if bound is reached
+        visited = {node}
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.visits += 1
+            for edge in node.outgoing if forward else node.incoming:
+                if edge in self.pending:
+                    continue
+                other = edge.end if forward else edge.start
+                if other.order == bound:
+                    return None
+                if other not in visited and (other.order < bound if forward else other.order > bound):
+                    visited.add(other)
+                    stack.append(other)
+        return list(visited)
+
+    def has_deadlock(self) -> bool:
+        return len(self.pending) > 0
+
+    def repair(self, tcg: TCG | None = None) -> int:
+        # flip a type 3 edge against first-come-first-serve on each deadlock cycle, and given the TCG, on each cycle
+        # of its orders too, which single-zone nodes can close with no RCG cycle;
+        # every cycle has such an edge and a flipped edge is never flipped back,
+        # so this ends within as many flips as there are such edges
+        # pending edges are retried one at a time rather than all of them after every flip
+        flips = 0
+        while True:
+            while self.pending:
+                closing = next(iter(self.pending))
+                del self.pending[closing]
+                if self.reorder(closing):
+                    continue
+                self.pending[closing] = None
+                _, edges = self.cycle(closing)
+                edge = next(edge for edge in edges if edge.start.vid > edge.end.vid)
+                edge.reverse()
+                self.unlink(edge.end, edge.start)
+                self.link(edge.start, edge.end)
+                flips += 1
+            if tcg is None or not tcg.has_cycle():
+                return flips
+            for edge in tcg.untangle():
+                self.unlink(edge.end, edge.start)
+                self.link(edge.start, edge.end)
+                flips += 1
+
+    def cycle(self, closing: RCG_Edge | None = None) -> tuple[list[RCG_Node], list[TCG_Edge]]:
+        # deadlock cycle closed by a pending edge, the first one by default, and its type 3 TCG edges
+        if not self.pending:
+            return [], []
+        closing = closing or next(iter(self.pending))
+        # the pending edge failed to insert, so the order has a path back to its start
+        parent: dict[RCG_Node, RCG_Edge] = {closing.end: closing}
+        stack = [closing.end]
+        while closing.start not in parent:
+            node = stack.pop()
+            self.visits += 1
+            for edge in node.outgoing:
+                if edge not in self.pending and edge.end not in parent and edge.end.order <= closing.start.order:
+                    parent[edge.end] = edge
+                    stack.append(edge.end)
+        edges = [closing]
+        node = closing.start
+        while node is not closing.end:
+            edges.append(parent[node])
+            node = parent[node].start
+        edges.reverse()
+        nodes = [edge.start for edge in edges]
+        tcg_edges = {
+            tcg_edge: None
+            for edge in edges
+            for tcg_edge in edge.via[0].outgoing
+            if tcg_edge.end is edge.via[1] and tcg_edge.type == 3
+        }
+        return nodes, list(tcg_edges)
+
+    def __repr__(self):
+        return f"RCG({len(self.nodes)} nodes, {len(self.edges)} edges)"
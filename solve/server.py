@@ -0,0 +1,140 @@
+import asyncio
+from collections import deque
+import json
+import signal
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from path import topology
+from tcg import TCG, TCG_Node, TIME_CHANGE_ZONE, TIME_ENTER_ZONE, TIME_WAIT, Vehicle
+
+# vehicles kept in the graph before it restarts from the last node of each zone and approach
+PRUNE = 1 << 12
+# latencies kept for the percentiles
+WINDOW = 1 << 16
+# bytes waiting to be sent before a connection stops reading
+HIGH_WATER = 1 << 16
+
+
+class Live:
+    # conflict graph of the recent arrivals, a reservation is final once it is sent,
+    # so each vehicle goes after every vehicle reserved before it in each zone of its path,
+    # first-come-first-serve in the order of the messages, which has no deadlock
+    def __init__(self):
+        self.tcg = TCG()
+        self.last: list[TCG_Node | None] = [None] * len(topology.zones)  # last node reserved in each zone
+        self.slots = [0] * len(topology.zones)  # vehicles reserved in each zone so far
+
+    def reserve(
+        self, id: int, arrive_time: int, start: int, end: int, payment: int = 0
+    ) -> list[tuple[int, int, float]]:
+        # (zone, position in its order, enter time) along the path
+        if topology.route_of(start, end) == len(topology.routes) - 1:
+            raise ValueError(f"no route from approach {start} to exit {end}")
+        if len(self.tcg.vehicles) >= PRUNE:
+            self.restart()
+        vehicle = Vehicle(id, arrive_time, start, end, payment)
+        self.tcg.add_vehicle(vehicle)
+        reservations = []
+        enter = arrive_time + TIME_ENTER_ZONE - TIME_CHANGE_ZONE
+        for node in vehicle.path:
+            prev = self.last[node.zid]
+            if prev is not None and all(edge.start is not prev for edge in node.incoming):
+                self.tcg.edges.append(prev.link_to(node, 4))
+            # the nodes before it are reserved, so the enter time is final
+            enter = max(
+                [enter + TIME_CHANGE_ZONE]
+                + [edge.start.time_enter + TIME_CHANGE_ZONE + TIME_WAIT for edge in node.incoming if edge.type != 1]
+            )
+            node.time_enter = enter
+            reservations.append((node.zid, self.slots[node.zid], enter))
+            self.slots[node.zid] += 1
+            self.last[node.zid] = node
+        return reservations
+
+    def restart(self):
+        # a new vehicle only links to the last node of each zone and the last vehicle of each approach,
+        # drop the edges behind them so the rest of the graph can be freed
+        prev = self.tcg.prev
+        self.tcg = TCG()
+        self.tcg.prev = prev
+        for node in self.last + [node for vehicle in prev if vehicle is not None for node in vehicle.path]:
+            if node is not None:
+                node.incoming = {}
+                node.outgoing = {}
+
+    def __repr__(self):
+        return f"Live({sum(self.slots)} reservations, {self.tcg})"
+
+
+class Server:
+    # one intersection shared by every connection, messages are handled one at a time on the event loop
+    def __init__(self):
+        self.live = Live()
+        self.latency: deque[float] = deque(maxlen=WINDOW)
+        self.arrivals = 0
+        self.errors = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while line := await reader.readline():
+            writer.write(self.answer(line.split()))
+            if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                await writer.drain()
+        writer.close()
+
+    def answer(self, fields: list[bytes]) -> bytes:
+        # a line `id arrive start end [payment]` is answered with `id` and `zone position enter` of each zone
+        # on its path, `stats` with a JSON line, anything else with `error` and the reason
+        begin = perf_counter()
+        if fields == [b"stats"]:
+            return json.dumps(self.stats()).encode() + b"\n"
+        try:
+            if len(fields) not in (4, 5):
+                raise ValueError("expected id arrive start end [payment]")
+            reservations = self.live.reserve(*map(int, fields))
+        except ValueError as error:
+            self.errors += 1
+            return f"error {error}\n".encode()
+        reply = fields[0] + b" " + " ".join(f"{zid} {slot} {enter:.2f}" for zid, slot, enter in reservations).encode()
+        self.arrivals += 1
+        self.latency.append(perf_counter() - begin)
+        return reply + b"\n"
+
+    def stats(self) -> dict:
+        # time from reading an arrival to writing its reservations, over the last WINDOW arrivals
+        latency = np.array(self.latency) * 1e3
+        return {
+            "arrivals": self.arrivals,
+            "errors": self.errors,
+            "vehicles in graph": len(self.live.tcg.vehicles),
+            "p50 ms": float(np.percentile(latency, 50)) if len(latency) else 0.0,
+            "p99 ms": float(np.percentile(latency, 99)) if len(latency) else 0.0,
+        }
+
+
+async def connect(address: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    # unix:[path] or [host]:[port]
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:") :])
+    host, port = address.rsplit(":", 1)
+    return await asyncio.open_connection(host or "localhost", int(port))
+
+
+async def serve(address: str):
+    server = Server()
+    if address.startswith("unix:"):
+        listener = await asyncio.start_unix_server(server.handle, address[len("unix:") :])
+    else:
+        host, port = address.rsplit(":", 1)
+        listener = await asyncio.start_server(server.handle, host or None, int(port))
+    print(f"serving on {address}", file=sys.stderr)
+    # run until interrupted or terminated, then print the final stats
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        async with listener:
+            await stop.wait()
+    finally:
+        print(server.live, json.dumps(server.stats()), file=sys.stderr)
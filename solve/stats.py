@@ -0,0 +1,58 @@
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, process_time
+
+
+class Stats:
+    # phase timers and counters of one run, a disabled one records nothing
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.begin = perf_counter()
+        self.phases: list[dict] = []  # in the order they end, nested phases first
+        self.counters: dict[str, int] = {}
+
+    def phase(self, name: str):
+        return self.timer(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def timer(self, name: str):
+        start, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                {
+                    "name": name,
+                    "start": start - self.begin,
+                    "wall": perf_counter() - start,
+                    "cpu": process_time() - cpu,
+                }
+            )
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: int):
+        if self.enabled:
+            self.counters[name] = value
+
+    def summary(self) -> dict:
+        return {"wall": perf_counter() - self.begin, "phases": self.phases, "counters": self.counters}
+
+    def trace(self) -> dict:
+        # chrome://tracing and Perfetto trace events, times in microseconds
+        events = [
+            {
+                "name": phase["name"],
+                "ph": "X",
+                "ts": phase["start"] * 1e6,
+                "dur": phase["wall"] * 1e6,
+                "pid": 0,
+                "tid": 0,
+                "args": {"cpu": phase["cpu"]},
+            }
+            for phase in self.phases
+        ]
+        end = max((phase["start"] + phase["wall"] for phase in self.phases), default=0.0)
+        events.append({"name": "counters", "ph": "C", "ts": end * 1e6, "pid": 0, "args": self.counters})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
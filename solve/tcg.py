@@ -0,0 +1,413 @@
+from bisect import bisect_left
+from heapq import heapify, heappop, heappush
+from itertools import combinations, pairwise
+from random import random
+from typing import TextIO
+
+from path import topology
+
+# define constants
+TIME_ENTER_ZONE = 1.4
+TIME_CHANGE_ZONE = 0.85
+TIME_WAIT = 0.2
+
+
+class Vehicle:
+    def __init__(self, id: int, arrive_time: int, start: int, end: int, payment: int = 0):
+        self.id = id
+        self.arrive_time = arrive_time
+        self.start = start
+        self.end = end
+        self.payment = payment
+        # a vehicle paying p counts as 1 + p vehicles in the weighted delay
+        self.weight = 1 + payment
+        self.route = topology.route_of(start, end)
+        self.path: list[TCG_Node] = []
+
+        for zone in topology.routes[self.route]:
+            node = TCG_Node(id, zone, arrive_time)
+            self.path.append(node)
+
+    def __repr__(self):
+        return f"{' → '.join(map(str, self.path))}"
+
+
+class TCG_Node:
+    def __init__(self, vid: int, zid: int, time: int):
+        super().__init__()
+        self.vid = vid
+        self.zid = zid
+        self.index = 0  # position in tcg.nodes
+        # insertion ordered, an edge is moved to the end of its new start when reversed
+        self.outgoing: dict[TCG_Edge, None] = {}
+        self.incoming: dict[TCG_Edge, None] = {}
+        self.time_enter = time + TIME_ENTER_ZONE
+        self.time_leave = 0
+
+    def link_to(self, other: "TCG_Node", type: int):
+        edge = TCG_Edge(type, self, other)
+        self.outgoing[edge] = None
+        other.incoming[edge] = None
+        return edge
+
+    def __repr__(self):
+        return f"({self.vid}, {self.zid})"
+
+
+class TCG_Edge:
+    def __init__(self, type: int, start: TCG_Node, end: TCG_Node):
+        self.type = type
+        self.start = start
+        self.end = end
+
+    def reverse(self):
+        # only reverse type 3 edge
+        if self.type != 3:
+            return
+        self.start, self.end = self.end, self.start
+        # update outgoing dicts, edges hash by identity so this takes constant time
+        self.start.outgoing[self] = None
+        del self.end.outgoing[self]
+        self.end.incoming[self] = None
+        del self.start.incoming[self]
+
+    def __repr__(self):
+        return f"TCGE({self.type}, {self.start} → {self.end})"
+
+
+class TCG:
+    def __init__(self, horizon: float | None = None):
+        super().__init__()
+        # skip type 3 edges between vehicles arriving more than `horizon` apart
+        self.horizon = horizon
+        self.nodes: list[TCG_Node] = []
+        self.edges: list[TCG_Edge] = []
+        self.vehicles: list[Vehicle] = []
+        self.prev: list[Vehicle] = [None] * len(topology.approaches)  # prev vehicle for each approach
+        # state of the last schedule() over node indices, reused by the next call
+        self.queue: list[int] = []  # nodes in the order they left the queue
+        self.position: list[int] = []  # position in the queue, len(nodes) if never queued
+        self.enqueued: list[int] = []  # position of the node that queued it, -1 for sources
+        self.in_degree: list[int] = []
+        self.zones: list[list[TCG_Node]] = [[] for _ in topology.zones]
+        self.size = 0  # number of edges then
+
+    def build(self, input: TextIO):
+        # keep reading until eof
+        # handle type 1 edge and type 2 edge
+        for line in input:
+            vehicle = Vehicle(*map(int, line.split()))
+            self.add_vehicle(vehicle)
+        # handle type 3 edge
+        self.build_type_3_edge()
+
+    def add_vehicle(self, vehicle: Vehicle):
+        self.vehicles.append(vehicle)
+        # add nodes to graph
+        for node in vehicle.path:
+            node.index = len(self.nodes)
+            self.nodes.append(node)
+        # handle type 1 edge
+        for start, end in pairwise(vehicle.path):
+            edge = start.link_to(end, 1)
+            self.edges.append(edge)
+        # handle type 2 edge on the zones both routes start with
+        prev = self.prev[vehicle.start]
+        if prev is not None:
+            shared = topology.shared[prev.route][vehicle.route]
+            for node1, node2 in zip(vehicle.path[:shared], prev.path[:shared]):
+                edge = node2.link_to(node1, 2)
+                self.edges.append(edge)
+        self.prev[vehicle.start] = vehicle
+
+    def build_type_3_edge(self):
+        # group nodes by zone in one pass, keep arrival order
+        zones: list[list[TCG_Node]] = [[] for _ in topology.zones]
+        for node in self.nodes:
+            zones[node.zid].append(node)
+        for nodes in zones:
+            if self.horizon is None:
+                # type 4 edge: type 2 edges only cover the zones two consecutive vehicles share from the start,
+                # so link each node to the last one of its approach in the zone to keep first-in-first-out
+                last: dict[int, TCG_Node] = {}
+                for node in nodes:
+                    start = self.vehicles[node.vid].start
+                    if start in last and all(edge.end is not node for edge in last[start].outgoing):
+                        edge = last[start].link_to(node, 4)
+                        self.edges.append(edge)
+                    last[start] = node
+                for node1, node2 in combinations(nodes, 2):
+                    if topology.conflict[self.vehicles[node1.vid].route][self.vehicles[node2.vid].route]:
+                        edge = node2.link_to(node1, 3)
+                        self.edges.append(edge)
+            else:
+                self.build_sparse_type_3_edge(nodes)
+
+    def build_sparse_type_3_edge(self, nodes: list[TCG_Node]):
+        # assume nodes are sorted by arrival time (as generator.py writes them)
+        arrive = [self.vehicles[node.vid].arrive_time for node in nodes]
+        route = [self.vehicles[node.vid].route for node in nodes]
+        last: dict[int, TCG_Node] = {}
+        for i, node1 in enumerate(nodes):
+            # type 4 edge: same approach keeps first-in-first-out order even without a type 2 edge
+            start = self.vehicles[node1.vid].start
+            if start in last and all(edge.end is not node1 for edge in last[start].outgoing):
+                edge = last[start].link_to(node1, 4)
+                self.edges.append(edge)
+            last[start] = node1
+            j = i + 1
+            while j < len(nodes) and arrive[j] - arrive[i] <= self.horizon:
+                node2 = nodes[j]
+                if topology.conflict[route[i]][route[j]]:
+                    edge = node2.link_to(node1, 3)
+                    self.edges.append(edge)
+                j += 1
+            # type 4 edge: order beyond the horizon is forced, keep it first-come-first-serve
+            if j < len(nodes):
+                edge = node1.link_to(nodes[j], 4)
+                self.edges.append(edge)
+
+    def reduce(self) -> list[list[TCG_Node]]:
+        # collapse each zone's type 3 and 4 edges to the chain of consecutive nodes, return the zone orders
+        zones = self.schedule()
+        if sum(len(nodes) for nodes in zones) == len(self.nodes):
+            self.chain(zones)
+        # otherwise cyclic orientation, no zone order to collapse to
+        return zones
+
+    def chain(self, zones: list[list[TCG_Node]]):
+        # type 3 edges between consecutive nodes of each zone order in place of the type 3 and 4 edges
+        self.edges = [edge for edge in self.edges if edge.type < 3]
+        for node in self.nodes:
+            node.outgoing = {edge: None for edge in node.outgoing if edge.type < 3}
+            node.incoming = {edge: None for edge in node.incoming if edge.type < 3}
+        for nodes in zones:
+            for node1, node2 in pairwise(nodes):
+                edge = node1.link_to(node2, 3)
+                self.edges.append(edge)
+            # a single-zone vehicle never holds a zone while waiting, so also chain
+            # the multi-zone nodes to keep their wait-for order visible to RCG
+            nodes = [node for node in nodes if len(self.vehicles[node.vid].path) > 1]
+            for node1, node2 in pairwise(nodes):
+                if next(reversed(node1.outgoing)).end is not node2:
+                    edge = node1.link_to(node2, 3)
+                    self.edges.append(edge)
+
+    def resort(
+        self, nodes: list[TCG_Node], position: dict[TCG_Node, int], i: int, j: int
+    ) -> tuple[list[TCG_Edge], list[TCG_Edge]]:
+        # sort nodes[i : j + 1] of a chained zone order by vehicle and relink only the chain edges at them,
+        # return the edges removed and added, the removed ones are left in self.edges for the caller to filter
+        old = {
+            (edge.start, edge.end): edge
+            for node in nodes[i : j + 1]
+            for edge in [*node.outgoing, *node.incoming]
+            if edge.type == 3
+        }
+        nodes[i : j + 1] = sorted(nodes[i : j + 1], key=lambda node: node.vid)
+        for k in range(i, j + 1):
+            position[nodes[k]] = k
+        pairs = {(nodes[k], nodes[k + 1]): None for k in range(max(i - 1, 0), min(j + 1, len(nodes) - 1))}
+
+        # multi-zone nodes from the one before the segment to the one after it, chained when not consecutive
+        def multi(k: int) -> bool:
+            return len(self.vehicles[nodes[k].vid].path) > 1
+
+        begin, end = i - 1, j + 1
+        while begin >= 0 and not multi(begin):
+            begin -= 1
+        while end < len(nodes) and not multi(end):
+            end += 1
+        indices = [k for k in range(begin if begin >= 0 else i, min(end + 1, len(nodes))) if multi(k)]
+        for k1, k2 in pairwise(indices):
+            if k2 != k1 + 1 and (i <= k1 <= j or i <= k2 <= j):
+                pairs[(nodes[k1], nodes[k2])] = None
+        removed = [edge for key, edge in old.items() if key not in pairs]
+        for edge in removed:
+            del edge.start.outgoing[edge]
+            del edge.end.incoming[edge]
+        added = [node1.link_to(node2, 3) for node1, node2 in pairs if (node1, node2) not in old]
+        self.edges.extend(added)
+        return removed, added
+
+    def has_cycle(self, edges: list[TCG_Edge] | None = None) -> bool:
+        # single-zone nodes can close a cycle no RCG node passes through,
+        # given the edges reversed since the last schedule, only the queue after them is redone
+        return sum(len(nodes) for nodes in self.schedule(edges)) < len(self.nodes)
+
+    def solve(self, method: str) -> list[TCG_Edge]:
+        # return reversed edges
+        edges: list[TCG_Edge] = []
+        if method in ("fcfs", "anneal", "exact"):
+            edges = [edge for edge in self.edges if edge.type == 3 and edge.start.vid > edge.end.vid]
+        # repair starts from a random orientation, likely to deadlock
+        if method in ("random", "repair"):
+            edges = [edge for edge in self.edges if edge.type == 3 and edge.start.vid > edge.end.vid and random() < 0.5]
+        for edge in edges:
+            edge.reverse()
+        if method == "weighted":
+            edges = self.weighted()
+        return edges
+
+    def weighted(self) -> list[TCG_Edge]:
+        # take vehicles from a heap in an order of the type 2 and 4 edges, each goes first on its type 3 edges to
+        # the vehicles left; like first-come-first-serve, one vehicle order in every zone has no deadlock
+        # the key is the earliest the vehicle can enter without waiting inside, less a bonus under one zone change:
+        # a vehicle of weight w goes ahead of one of weight 1 that can enter up to gap * (w - 1) / (w + 1) earlier,
+        # exactly when that lowers the weighted delay of the pair
+        # type 2 edges only join a vehicle to the one before it and sparse graphs skip vehicles far apart,
+        # so a type 4 edge from the node taken before in the same zone keeps every zone in the vehicle order
+        # return reversed edges, O(E log V)
+        gap = TIME_CHANGE_ZONE + TIME_WAIT
+        vehicles = self.vehicles
+        bonus = [gap * (vehicle.weight - 1) / (vehicle.weight + 1) for vehicle in vehicles]
+        shift = [vehicle.arrive_time + TIME_ENTER_ZONE for vehicle in vehicles]
+        step = [0] * len(self.nodes)  # position of each node in its path
+        in_degree = [0] * len(vehicles)  # type 2 and 4 edges from vehicles left
+        for vehicle in vehicles:
+            for k, node in enumerate(vehicle.path):
+                step[node.index] = k
+                in_degree[node.vid] += sum(1 for edge in node.incoming if edge.type != 3 and edge.start.vid != node.vid)
+        time = [0.0] * len(self.nodes)
+        done = [False] * len(vehicles)
+        heap = [(shift[v] - bonus[v], v) for v in range(len(vehicles)) if in_degree[v] == 0]
+        heapify(heap)
+        edges: list[TCG_Edge] = []
+        last: list[TCG_Node | None] = [None] * len(topology.zones)  # last node taken in each zone
+        while heap:
+            key, v = heappop(heap)
+            # stale entry, the shift has gone up since
+            if done[v] or key != shift[v] - bonus[v]:
+                continue
+            done[v] = True
+            enter = vehicles[v].arrive_time + TIME_ENTER_ZONE - TIME_CHANGE_ZONE
+            for node in vehicles[v].path:
+                for edge in [edge for edge in node.incoming if edge.type == 3 and not done[edge.start.vid]]:
+                    edge.reverse()
+                    edges.append(edge)
+                prev = last[node.zid]
+                if prev is not None and all(edge.start is not prev for edge in node.incoming):
+                    self.edges.append(prev.link_to(node, 4))
+                last[node.zid] = node
+                # every other vehicle before it is taken, so the enter time is final
+                enter = max(
+                    [enter + TIME_CHANGE_ZONE]
+                    + [time[edge.start.index] + gap for edge in node.incoming if edge.start.vid != v]
+                )
+                time[node.index] = enter
+                for edge in node.outgoing:
+                    u = edge.end.vid
+                    if u == v:
+                        continue
+                    after = enter + gap - step[edge.end.index] * TIME_CHANGE_ZONE
+                    if after > shift[u]:
+                        shift[u] = after
+                        if edge.type == 3 and in_degree[u] == 0:
+                            heappush(heap, (shift[u] - bonus[u], u))
+                    if edge.type != 3:
+                        in_degree[u] -= 1
+                        if in_degree[u] == 0:
+                            heappush(heap, (shift[u] - bonus[u], u))
+        return edges
+
+    def schedule(self, edges: list[TCG_Edge] | None = None) -> list[list[TCG_Node]]:
+        # per-zone nodes in the order of first-in-first-out Kahn's algorithm,
+        # given the edges reversed since the last call and no other change, only redo the queue after
+        # the first step they can change
+        n = len(self.nodes)
+        if edges is None or len(self.position) != n or self.size != len(self.edges):
+            self.size = len(self.edges)
+            return self.run(0)
+        step = len(self.queue)
+        for node in {node for edge in edges for node in (edge.start, edge.end)}:
+            # the node leaves the queue, or its last incoming edge before or after the change queues it
+            last = max((self.position[edge.start.index] for edge in node.incoming), default=-1)
+            step = min(step, self.position[node.index], self.enqueued[node.index], last)
+        return self.run(max(step, 0))
+
+    def run(self, step: int) -> list[list[TCG_Node]]:
+        # keep the first `step` nodes of the queue and continue from there
+        n = len(self.nodes)
+        queue, position, enqueued = self.queue, self.position, self.enqueued
+        if step == 0:
+            self.position = position = [n] * n
+            self.enqueued = enqueued = [n] * n
+            self.in_degree = in_degree = [len(node.incoming) for node in self.nodes]
+            queue[:] = [i for i in range(n) if in_degree[i] == 0]
+            for i in queue:
+                enqueued[i] = -1
+            self.zones = [[] for _ in topology.zones]
+        else:
+            in_degree = self.in_degree
+            # the rest of the queue and the nodes left on a cycle start over
+            rest = queue[step:] + [i for i in range(n) if position[i] == n] if len(queue) < n else queue[step:]
+            for zone in self.zones:
+                del zone[bisect_left(zone, step, key=lambda node: position[node.index]) :]
+            # nodes queued by the first `step` nodes stay queued
+            end = step
+            while end < len(queue) and enqueued[queue[end]] < step:
+                end += 1
+            del queue[end:]
+            for i in rest:
+                in_degree[i] = 0
+                position[i] = n
+                if enqueued[i] >= step:
+                    enqueued[i] = n
+            for i in rest:
+                for edge in self.nodes[i].outgoing:
+                    in_degree[edge.end.index] += 1
+
+        self.drain(step)
+        return [zone[:] for zone in self.zones]
+
+    def drain(self, k: int):
+        # take nodes from the queue from position k on
+        nodes, queue, position = self.nodes, self.queue, self.position
+        in_degree, enqueued = self.in_degree, self.enqueued
+        # the queue grows while it is walked
+        while k < len(queue):
+            i = queue[k]
+            position[i] = k
+            self.zones[nodes[i].zid].append(nodes[i])
+            for edge in nodes[i].outgoing:
+                j = edge.end.index
+                in_degree[j] -= 1
+                # add to queue if in degree is 0
+                if in_degree[j] == 0:
+                    enqueued[j] = k
+                    queue.append(j)
+            k += 1
+
+    def untangle(self) -> list[TCG_Edge]:
+        # finish the last schedule past each stall: walk back from the first node left out to a cycle, every one
+        # has a type 3 edge against first-come-first-serve, reverse it and go on; return the reversed edges
+        # the queue is then a topological order but not the one schedule() finds, so the next one starts over
+        n = len(self.nodes)
+        queue, position, in_degree = self.queue, self.position, self.in_degree
+        edges: list[TCG_Edge] = []
+        first = 0
+        while len(queue) < n:
+            while position[first] < n:
+                first += 1
+            # every node left out waits on another one left out
+            parent: dict[int, TCG_Edge] = {}
+            i = first
+            while i not in parent:
+                parent[i] = next(edge for edge in self.nodes[i].incoming if position[edge.start.index] == n)
+                i = parent[i].start.index
+            edge = parent[i]
+            while not (edge.type == 3 and edge.start.vid > edge.end.vid):
+                edge = parent[edge.start.index]
+            edge.reverse()
+            edges.append(edge)
+            in_degree[edge.end.index] += 1
+            in_degree[edge.start.index] -= 1
+            if in_degree[edge.start.index] == 0:
+                self.enqueued[edge.start.index] = -1
+                queue.append(edge.start.index)
+                self.drain(len(queue) - 1)
+        self.size = -1
+        return edges
+
+    def __repr__(self):
+        return f"TCG({len(self.vehicles)} vehicles, {len(self.nodes)} nodes, {len(self.edges)} edges)"
@@ -0,0 +1,98 @@
+import numpy as np
+
+from tcg import TCG, TIME_CHANGE_ZONE, TIME_ENTER_ZONE, TIME_WAIT
+
+
+class Timing:
+    def __init__(self, tcg: TCG):
+        # arrays over tcg.nodes and tcg.edges, kept in sync with reverse()
+        self.tcg = tcg
+        index = {node: i for i, node in enumerate(tcg.nodes)}
+        self.src = np.array([index[edge.start] for edge in tcg.edges], dtype=np.int64)
+        self.dst = np.array([index[edge.end] for edge in tcg.edges], dtype=np.int64)
+        # enter the next zone after passing through, or the same zone after the other vehicle leaves it
+        self.weight = np.array(
+            [TIME_CHANGE_ZONE if edge.type == 1 else TIME_CHANGE_ZONE + TIME_WAIT for edge in tcg.edges]
+        )
+        arrive = np.array([vehicle.arrive_time for vehicle in tcg.vehicles], dtype=float)
+        vids = np.array([node.vid for node in tcg.nodes], dtype=np.int64)
+        self.release = arrive[vids] + TIME_ENTER_ZONE
+        # last node of each vehicle and its enter time without waiting,
+        # a vehicle whose exit has no route from its approach never enters a zone and is left out
+        routed = np.array([v for v, vehicle in enumerate(tcg.vehicles) if vehicle.path], dtype=np.int64)
+        self.last = np.array([index[tcg.vehicles[v].path[-1]] for v in routed.tolist()], dtype=np.int64)
+        length = np.array([len(tcg.vehicles[v].path) for v in routed.tolist()], dtype=np.int64)
+        self.free = arrive[routed] + TIME_ENTER_ZONE + (length - 1) * TIME_CHANGE_ZONE
+        self.priority = np.array([tcg.vehicles[v].weight for v in routed.tolist()], dtype=float)
+        # edges at either end of each node, reversing an edge keeps it at the same two nodes
+        ends = np.concatenate([self.src, self.dst])
+        order = np.argsort(ends, kind="stable")
+        self.incident = np.tile(np.arange(len(self.src)), 2)[order]
+        self.offsets = np.searchsorted(ends[order], np.arange(len(self.release) + 1))
+
+    def reverse(self, indices: list[int]):
+        # reverse edges by index in tcg.edges
+        self.src[indices], self.dst[indices] = self.dst[indices], self.src[indices]
+
+    def edges_at(self, nodes: np.ndarray) -> np.ndarray:
+        # indices of the edges at either end of the nodes, in or out
+        begin, count = self.offsets[nodes], self.offsets[nodes + 1] - self.offsets[nodes]
+        return self.incident[np.repeat(begin - np.cumsum(count) + count, count) + np.arange(count.sum())]
+
+    def evaluate(self, time: np.ndarray | None = None, nodes: list[int] | None = None) -> np.ndarray | None:
+        # longest path in topological order, one level of nodes at a time
+        # with a previous time and changed nodes, only recompute the nodes downstream of them
+        # return enter time of each node, None if the graph has a cycle
+        n = len(self.release)
+        src, dst, weight, offsets = self.src, self.dst, self.weight, self.offsets
+
+        def outgoing(frontier: np.ndarray) -> np.ndarray:
+            edges = self.edges_at(frontier)
+            return edges[src[edges] == np.repeat(frontier, offsets[frontier + 1] - offsets[frontier])]
+
+        if time is None or nodes is None:
+            region = np.ones(n, dtype=bool)
+            time = self.release.copy()
+        else:
+            region = np.zeros(n, dtype=bool)
+            frontier = np.unique(nodes)
+            region[frontier] = True
+            while frontier.size:
+                targets = dst[outgoing(frontier)]
+                frontier = np.unique(targets[~region[targets]])
+                region[frontier] = True
+            # restart the region from the edges entering it
+            time = time.copy()
+            time[region] = self.release[region]
+            entering = region[dst] & ~region[src]
+            np.maximum.at(time, dst[entering], time[src[entering]] + weight[entering])
+
+        in_degree = np.bincount(dst[region[src]], minlength=n)
+        frontier = np.flatnonzero(region & (in_degree == 0))
+        done = 0
+        while frontier.size:
+            done += frontier.size
+            edges = outgoing(frontier)
+            targets = dst[edges]
+            np.maximum.at(time, targets, time[src[edges]] + weight[edges])
+            np.subtract.at(in_degree, targets, 1)
+            frontier = np.unique(targets[in_degree[targets] == 0])
+        return time if done == region.sum() else None
+
+    def delay(self, time: np.ndarray) -> np.ndarray:
+        # delay of each vehicle
+        return time[self.last] - self.free
+
+    def weighted_delay(self, time: np.ndarray) -> float:
+        # mean delay with each vehicle counted by its weight
+        return float(self.priority @ self.delay(time) / self.priority.sum()) if len(self.last) else 0.0
+
+    def makespan(self, time: np.ndarray) -> float:
+        # time the last vehicle leaves the intersection
+        return float(time[self.last].max() + TIME_CHANGE_ZONE) if len(self.last) else 0.0
+
+    def apply(self, time: np.ndarray):
+        # write enter and leave times back to the TCG nodes
+        for node, enter in zip(self.tcg.nodes, time.tolist()):
+            node.time_enter = enter
+            node.time_leave = enter + TIME_CHANGE_ZONE
@@ -0,0 +1,160 @@
+import sys
+
+import numpy as np
+
+from binary import is_binary, read_schedule, read_testcase
+from compact import CompactTCG, topological
+from path import topology
+
+# constraint behind each TCG edge type
+REASONS = {1: "path", 2: "fifo", 3: "schedule"}
+# problems printed before the rest are only counted
+LIMIT = 20
+# edges scanned while shortening a reported cycle
+SEARCH = 1 << 16
+
+
+def load_testcase(path: str) -> CompactTCG:
+    # nodes and type 1 and type 2 edges only, the schedule gives the zone orders
+    tcg = CompactTCG()
+    if is_binary(path):
+        tcg.build_path(read_testcase(path))
+    else:
+        with open(path) as f:
+            tcg.build_path(f)
+    return tcg
+
+
+def load_schedule(path: str) -> list[np.ndarray]:
+    if is_binary(path):
+        return [np.asarray(zone, dtype=np.int64) for zone in read_schedule(path)]
+    with open(path) as f:
+        return [np.array(line.split(), dtype=np.int64) for line in f]
+
+
+def cycle(n: int, src: np.ndarray, dst: np.ndarray, done: np.ndarray) -> list[int]:
+    # a short cycle among the nodes left over by Kahn's algorithm, as edge indices
+    # every node left over has an incoming edge from another, so walking them backwards ends on a cycle
+    left = np.flatnonzero(~done[src] & ~done[dst])
+    incoming = np.full(n, -1, dtype=np.int64)
+    incoming[dst[left]] = left
+    incoming = incoming.tolist()
+    src_list, dst_list = src.tolist(), dst.tolist()
+    node, path = int(dst[left[0]]), {}
+    while node not in path:
+        path[node] = incoming[node]
+        node = src_list[incoming[node]]
+    # breadth-first search from each node of that cycle back to itself, shorter than the best so far,
+    # until SEARCH edges are scanned in all, then the cycle found so far is reported
+    edges = [path[node]]
+    while src_list[edges[-1]] != node:
+        edges.append(path[src_list[edges[-1]]])
+    edges.reverse()
+    order = left[np.argsort(src[left], kind="stable")]
+    offsets = np.searchsorted(src[order], np.arange(n + 1)).tolist()
+    order = order.tolist()
+    budget = SEARCH
+    for root in [src_list[k] for k in edges]:
+        parent = {root: -1}
+        level = [root]
+        for _ in range(len(edges) - 1):
+            found, after = None, []
+            for node in level:
+                budget -= offsets[node + 1] - offsets[node]
+                if budget < 0:
+                    return edges
+                for k in order[offsets[node] : offsets[node + 1]]:
+                    if dst_list[k] == root:
+                        found = k
+                        break
+                    if dst_list[k] not in parent:
+                        parent[dst_list[k]] = k
+                        after.append(dst_list[k])
+                if found is not None:
+                    break
+            if found is not None:
+                edges = [found]
+                while parent[src_list[edges[-1]]] >= 0:
+                    edges.append(parent[src_list[edges[-1]]])
+                edges.reverse()
+                break
+            level = after
+    return edges
+
+
+def zone_orders(tcg: CompactTCG, zones: list[np.ndarray]) -> tuple[list[np.ndarray], list[str]]:
+    # nodes of each zone in schedule order and the problems found mapping vehicle ids to them
+    problems = []
+    if len(zones) != len(topology.zones):
+        return [], [f"{len(zones)} zones in the schedule, expected {len(topology.zones)}"]
+    n, m = len(tcg.ids), len(topology.zones)
+    sorter = np.argsort(tcg.ids, kind="stable")
+    # node of each vehicle and zone, -1 off its path
+    node = np.full(n * m, -1, dtype=np.int64)
+    node[tcg.vehicle * m + tcg.zid] = np.arange(len(tcg.vid))
+    orders = []
+    for zid, vids in enumerate(zones):
+        vehicle = sorter[np.minimum(np.searchsorted(tcg.ids, vids, sorter=sorter), max(n - 1, 0))] if n else vids[:0]
+        known = tcg.ids[vehicle] == vids if n else np.zeros(len(vids), dtype=bool)
+        problems += [f"zone {zid}: vehicle {vid} is not in the testcase" for vid in vids[~known].tolist()]
+        nodes = node[vehicle[known] * m + zid]
+        problems += [f"zone {zid}: vehicle {vid} does not pass the zone" for vid in vids[known][nodes < 0].tolist()]
+        nodes = nodes[nodes >= 0]
+        counts = np.bincount(nodes, minlength=len(tcg.vid))
+        repeated = np.flatnonzero(counts > 1)
+        problems += [
+            f"zone {zid}: vehicle {vid} is listed {count} times"
+            for vid, count in zip(tcg.vid[repeated].tolist(), counts[repeated].tolist())
+        ]
+        missing = np.flatnonzero((counts == 0) & (tcg.zid == zid))
+        problems += [f"zone {zid}: vehicle {vid} is missing" for vid in tcg.vid[missing].tolist()]
+        orders.append(nodes)
+    return orders, problems
+
+
+def validate(tcg: CompactTCG, zones: list[np.ndarray]) -> list[str]:
+    # problems of the schedule, empty if the vehicles can follow it without a deadlock
+    orders, problems = zone_orders(tcg, zones)
+    if problems:
+        return problems
+    # path order, same-approach first-in-first-out and the zone orders together have to be acyclic
+    n = len(tcg.vid)
+    tcg.chain(orders)
+    queue = topological(n, tcg.src, tcg.dst, tcg.stamp)
+    if len(queue) < n:
+        done = np.zeros(n, dtype=bool)
+        done[queue] = True
+        edges = cycle(n, tcg.src, tcg.dst, done)
+        steps = [f"({tcg.vid[tcg.src[k]]}, {tcg.zid[tcg.src[k]]}) -{REASONS[tcg.type[k]]}->" for k in edges]
+        return ["order cycle: " + " ".join(steps) + f" ({tcg.vid[tcg.dst[edges[-1]]]}, {tcg.zid[tcg.dst[edges[-1]]]})"]
+    # no vehicle may hold a zone while waiting on a vehicle that waits on it
+    first, rsrc, rdst = tcg.rcg()
+    queue = topological(len(first), rsrc, rdst, np.arange(len(rsrc)))
+    if len(queue) < len(first):
+        done = np.zeros(len(first), dtype=bool)
+        done[queue] = True
+        edges = cycle(len(first), rsrc, rdst, done)
+        holds = [
+            f"vehicle {tcg.vid[tcg.src[first[i]]]} holds zone {tcg.zid[tcg.src[first[i]]]} "
+            f"for zone {tcg.zid[tcg.dst[first[i]]]}"
+            for i in rsrc[edges].tolist()
+        ]
+        return ["deadlock: " + ", then ".join(holds)]
+    return []
+
+
+if __name__ == "__main__":
+    # exit with 1 if the schedule of the testcase is not realizable
+    args = sys.argv[1:]
+    if len(args) not in (2, 3):
+        exit("Usage: python validate.py <testcase> <schedule> [topology]")
+    if len(args) == 3:
+        topology.load(args[2])
+    problems = validate(load_testcase(args[0]), load_schedule(args[1]))
+    for problem in problems[:LIMIT]:
+        print(problem)
+    if len(problems) > LIMIT:
+        print(f"... and {len(problems) - LIMIT} more")
+    if problems:
+        exit(1)
+    print("valid")
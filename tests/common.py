@@ -0,0 +1,46 @@
+import importlib.util
+import io
+import os
+import sys
+from argparse import Namespace
+from contextlib import redirect_stdout
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "solve"))
+sys.path.append(ROOT)
+
+from compact import CompactTCG  # noqa: E402
+from generator import draw  # noqa: E402
+from validate import validate  # noqa: E402
+
+# solve/__main__.py under a name that does not clash with the test runner's __main__
+spec = importlib.util.spec_from_file_location("solve_main", os.path.join(ROOT, "solve", "__main__.py"))
+solve_main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(solve_main)
+
+
+def generate(time: int, num_cars: float = 2.0, seed: int = 0, payment: bool = False) -> str:
+    # text testcase drawn like generator.py --fast
+    args = Namespace(time=time, num_cars=num_cars, allow_u_turn=False, pay_prob=0.25, pay_max=100, payment=payment)
+    return "".join(" ".join(map(str, row)) + "\n" for rows in draw(args, seed) for row in rows.tolist())
+
+
+def solve(
+    text: str, strategy: str, horizon: float | None = None, budget: float = 0.2, compact: bool = False
+) -> list[np.ndarray]:
+    # zone orders written by solve
+    output = io.StringIO()
+    with redirect_stdout(io.StringIO()):
+        if compact:
+            solve_main.main_compact(io.StringIO(text), output, strategy, horizon)
+        else:
+            solve_main.main(io.StringIO(text), output, strategy, horizon, budget)
+    return [np.array(line.split(), dtype=np.int64) for line in output.getvalue().splitlines()]
+
+
+def problems(text: str, zones: list[np.ndarray]) -> list[str]:
+    tcg = CompactTCG()
+    tcg.build_path(io.StringIO(text))
+    return validate(tcg, zones)
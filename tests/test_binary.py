@@ -0,0 +1,43 @@
+from contextlib import redirect_stdout
+import io
+
+import numpy as np
+
+from common import generate, solve, solve_main
+
+# imported as a module once common has put solve/ on the path, pytest would collect TestcaseWriter as a test class
+import binary  # noqa: E402
+
+
+def test_testcase_round_trip(tmp_path):
+    rows = np.loadtxt(io.StringIO(generate(40, payment=True)), dtype=np.int64)
+    writer = binary.TestcaseWriter(tmp_path / "testcase.bin")
+    writer.write(rows[:10])
+    writer.write(rows[10:])
+    writer.close()
+    records = binary.read_testcase(tmp_path / "testcase.bin")
+    assert np.array_equal(np.stack([records[name] for name in binary.COLUMNS], axis=1), rows)
+
+
+def test_schedule_round_trip(tmp_path):
+    zones = [[3, 1, 2], [], [0], [5, 4]]
+    binary.write_schedule(tmp_path / "schedule.bin", zones)
+    assert [zone.tolist() for zone in binary.read_schedule(tmp_path / "schedule.bin")] == zones
+
+
+def test_empty_schedule_round_trip(tmp_path):
+    binary.write_schedule(tmp_path / "schedule.bin", [[]] * 4)
+    assert [zone.tolist() for zone in binary.read_schedule(tmp_path / "schedule.bin")] == [[]] * 4
+
+
+def test_binary_testcase_solves_like_text(tmp_path):
+    text = generate(40)
+    writer = binary.TestcaseWriter(tmp_path / "testcase.bin")
+    writer.write(np.loadtxt(io.StringIO(text), dtype=np.int64))
+    writer.close()
+    output = io.StringIO()
+    with redirect_stdout(io.StringIO()):
+        solve_main.main(binary.read_testcase(tmp_path / "testcase.bin"), output, "fcfs")
+    assert [line.split() for line in output.getvalue().splitlines()] == [
+        zone.astype(str).tolist() for zone in solve(text, "fcfs")
+    ]
@@ -0,0 +1,53 @@
+import io
+import random
+
+import pytest
+
+from common import generate
+from rcg import RCG
+from tcg import TCG
+
+
+def chained(text: str) -> tuple[TCG, list]:
+    tcg = TCG(3)
+    tcg.build(io.StringIO(text))
+    tcg.solve("fcfs")
+    return tcg, tcg.reduce()
+
+
+def pairs(tcg: TCG) -> list[tuple[int, int, int, int]]:
+    return sorted((edge.start.vid, edge.start.zid, edge.end.vid, edge.end.zid) for edge in tcg.edges)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_resort_matches_chain(seed):
+    # sorting a segment of a zone order relinks the same chain edges as chaining every zone again,
+    # and the RCG updated with them matches a fresh one
+    random.seed(seed)
+    text = generate(30, num_cars=3.0, seed=seed)
+    tcg, zones = chained(text)
+    full, _ = chained(text)
+    for _ in range(10):
+        nodes = random.choice([nodes for nodes in zones if len(nodes) > 1])
+        random.shuffle(nodes)
+        tcg.chain(zones)
+        rcg = RCG()
+        rcg.build(tcg)
+        position = {node: k for nodes in zones for k, node in enumerate(nodes)}
+        i = random.randrange(len(nodes) - 1)
+        j = random.randrange(i + 1, len(nodes))
+        old, new = tcg.resort(nodes, position, i, j)
+        tcg.edges = [edge for edge in tcg.edges if edge not in old]
+        for edge in old:
+            rcg.unlink(edge.start, edge.end)
+        for edge in new:
+            rcg.link(edge.start, edge.end)
+        rcg.insert()
+        assert nodes[i : j + 1] == sorted(nodes[i : j + 1], key=lambda node: node.vid)
+        assert all(position[node] == k for k, node in enumerate(nodes))
+        full.chain([[full.nodes[node.index] for node in nodes] for nodes in zones])
+        assert pairs(tcg) == pairs(full)
+        fresh = RCG()
+        fresh.build(tcg)
+        assert len(rcg.edges) == len(fresh.edges)
+        assert rcg.has_deadlock() == fresh.has_deadlock()
@@ -0,0 +1,15 @@
+import pytest
+
+from common import solve
+
+
+@pytest.mark.parametrize("strategy", ["fcfs", "random", "repair", "weighted", "anneal", "exact"])
+def test_empty_testcase(strategy):
+    assert [zone.tolist() for zone in solve("", strategy)] == [[]] * 4
+
+
+@pytest.mark.parametrize("strategy", ["fcfs", "random", "repair", "weighted", "anneal", "exact"])
+def test_vehicle_without_a_route(strategy):
+    # exit 9 has no route from approach 1, the vehicle never enters a zone
+    zones = solve("0 0 0 1\n1 0 1 9\n2 1 2 3\n", strategy)
+    assert [zone.tolist() for zone in zones] == [[0], [0], [2], [2]]
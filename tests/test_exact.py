@@ -0,0 +1,44 @@
+import io
+from itertools import product
+
+import pytest
+
+from common import generate
+from exact import exact
+from rcg import RCG
+from tcg import TCG
+from timing import Timing
+
+
+def brute_force(text: str) -> float:
+    # best makespan over every deadlock-free orientation of the type 3 edges
+    best = float("inf")
+    tcg = TCG()
+    tcg.build(io.StringIO(text))
+    conflicts = [edge for edge in tcg.edges if edge.type == 3]
+    for flips in product([False, True], repeat=len(conflicts)):
+        for edge, flip in zip(conflicts, flips):
+            if flip:
+                edge.reverse()
+        rcg = RCG()
+        rcg.build(tcg)
+        if not tcg.has_cycle() and not rcg.has_deadlock():
+            timing = Timing(tcg)
+            best = min(best, timing.makespan(timing.evaluate()))
+        for edge, flip in zip(conflicts, flips):
+            if flip:
+                edge.reverse()
+    return best
+
+
+@pytest.mark.parametrize("time, num_cars, seed", [(4, 1.0, 1), (5, 1.5, 2), (5, 1.5, 3), (6, 1.0, 2)])
+def test_exact_matches_brute_force(time, num_cars, seed):
+    text = generate(time, num_cars=num_cars, seed=seed, payment=True)
+    tcg = TCG()
+    tcg.build(io.StringIO(text))
+    tcg.solve("exact")
+    rcg = RCG()
+    rcg.build(tcg)
+    _, best, search = exact(tcg, rcg, Timing(tcg), 10.0)
+    assert search["proven"]
+    assert best == pytest.approx(brute_force(text))
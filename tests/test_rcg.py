@@ -0,0 +1,34 @@
+import io
+import random
+
+import pytest
+
+from common import generate
+from rcg import RCG
+from tcg import TCG
+
+
+def links(rcg: RCG) -> set:
+    index = {node: k for k, node in enumerate(rcg.nodes)}
+    return {(index[start], index[end], via) for start, end, via in rcg.edges}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_update_matches_build(seed):
+    # random orientations, some of them deadlocked, applied to the RCG from the reversed edges only
+    random.seed(seed)
+    tcg = TCG()
+    tcg.build(io.StringIO(generate(30, num_cars=3.0, seed=seed)))
+    rcg = RCG()
+    rcg.build(tcg)
+    deadlocks = 0
+    for _ in range(6):
+        rcg.update(tcg.solve("random"))
+        full = RCG()
+        full.build(tcg)
+        assert links(rcg) == links(full)
+        assert rcg.has_deadlock() == full.has_deadlock()
+        deadlocks += rcg.has_deadlock()
+        # edges in the order go forward
+        assert all(edge.start.order < edge.end.order for edge in rcg.edges.values() if edge not in rcg.pending)
+    assert deadlocks > 0
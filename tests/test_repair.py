@@ -0,0 +1,35 @@
+from contextlib import redirect_stdout
+import io
+import random
+
+import pytest
+
+from common import generate, solve_main
+from rcg import RCG
+from tcg import TCG
+
+
+@pytest.mark.parametrize("horizon", [None, 3.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_repair_flips_are_bounded(seed, horizon):
+    # each flip turns a conflict against first-come-first-serve around and none is turned back
+    random.seed(seed)
+    tcg = TCG(horizon)
+    tcg.build(io.StringIO(generate(20, num_cars=3.0, seed=seed)))
+    tcg.solve("repair")
+    against = sum(edge.type == 3 and edge.start.vid > edge.end.vid for edge in tcg.edges)
+    rcg = RCG()
+    rcg.build(tcg)
+    assert rcg.repair(tcg) <= against
+    assert not tcg.has_cycle() and not rcg.has_deadlock()
+    # the conflicts that do not deadlock keep the random order
+    assert any(edge.type == 3 and edge.start.vid > edge.end.vid for edge in tcg.edges)
+
+
+@pytest.mark.parametrize("horizon", [None, 3.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_repair_needs_no_retries(seed, horizon):
+    random.seed(seed)
+    with redirect_stdout(io.StringIO()):
+        summary = solve_main.main(io.StringIO(generate(20, num_cars=3.0, seed=seed)), io.StringIO(), "repair", horizon)
+    assert summary["retries"] == 0
@@ -0,0 +1,26 @@
+import io
+import random
+
+import pytest
+
+from common import generate
+from tcg import TCG
+
+
+def orders(zones):
+    return [[node.index for node in nodes] for nodes in zones]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_schedule_matches_full(seed):
+    # random orientations, some of them cyclic, rescheduled from the reversed edges only
+    random.seed(seed)
+    tcg = TCG()
+    tcg.build(io.StringIO(generate(30, num_cars=3.0, seed=seed)))
+    edges = None
+    for _ in range(6):
+        zones = tcg.schedule(edges)
+        full = TCG()
+        full.nodes, full.edges = tcg.nodes, tcg.edges
+        assert orders(zones) == orders(full.schedule())
+        edges = tcg.solve("random")
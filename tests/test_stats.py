@@ -0,0 +1,37 @@
+import io
+import random
+
+import pytest
+
+from common import generate, solve_main
+from stats import Stats
+from tcg import TCG
+
+
+def oriented(text: str, strategy: str, budget: float = 0.2) -> tuple[TCG, dict]:
+    tcg = TCG()
+    tcg.build(io.StringIO(text))
+    stats = Stats()
+    solve_main.orient(tcg, strategy, None, budget, io.StringIO(), stats)
+    return tcg, stats.counters
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_anneal_counts_its_flips(seed):
+    random.seed(seed)
+    text = generate(40, num_cars=3.0, seed=seed)
+    _, fcfs = oriented(text, "fcfs")
+    _, counters = oriented(text, "anneal")
+    assert counters["moves"] > 0
+    assert counters["reversed"] - fcfs["reversed"] >= counters["moves"]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_exact_counts_its_flips(seed):
+    random.seed(seed)
+    text = generate(12, num_cars=3.0, seed=seed, payment=True)
+    fcfs, before = oriented(text, "fcfs")
+    tcg, counters = oriented(text, "exact", budget=0.3)
+    # exact starts from first-come-first-serve and reorients once
+    changed = sum(a.start.vid != b.start.vid for a, b in zip(fcfs.edges, tcg.edges))
+    assert counters["reversed"] - before["reversed"] == changed
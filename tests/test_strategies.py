@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from common import generate, problems, solve
+
+seeds = pytest.mark.parametrize("seed", range(4))
+
+
+@seeds
+@pytest.mark.parametrize("horizon", [None, 3.0])
+@pytest.mark.parametrize("strategy", ["fcfs", "random", "repair", "weighted", "anneal", "exact"])
+def test_schedule_is_valid(strategy, horizon, seed):
+    # dense graphs need the same-approach order in every zone, sparse ones the orders collapsed after solving
+    random.seed(seed)
+    # exact only searches small testcases
+    text = generate(12 if strategy == "exact" else 40, num_cars=3.0, seed=seed, payment=True)
+    assert problems(text, solve(text, strategy, horizon, budget=0.2)) == []
+
+
+@seeds
+@pytest.mark.parametrize("horizon", [None, 3.0])
+@pytest.mark.parametrize("strategy", ["fcfs", "random"])
+def test_compact_schedule_is_valid(strategy, horizon, seed):
+    random.seed(seed)
+    text = generate(40, num_cars=3.0, seed=seed, payment=True)
+    assert problems(text, solve(text, strategy, horizon, compact=True)) == []
+
+
+def test_compact_rejects_other_strategies():
+    with pytest.raises(ValueError):
+        solve(generate(4), "anneal", compact=True)
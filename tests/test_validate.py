@@ -0,0 +1,34 @@
+import numpy as np
+
+from common import generate, problems, solve
+from validate import cycle
+
+
+def test_reversed_zone_orders_report_a_cycle():
+    text = generate(2000, seed=1)
+    zones = [zone[::-1] for zone in solve(text, "fcfs", horizon=3)]
+    reported = problems(text, zones)
+    assert len(reported) == 1 and reported[0].startswith("order cycle")
+
+
+def test_missing_vehicle():
+    text = generate(20, seed=2)
+    zones = solve(text, "fcfs")
+    vid = int(zones[0][0])
+    zones[0] = zones[0][1:]
+    assert problems(text, zones) == [f"zone 0: vehicle {vid} is missing"]
+
+
+def test_unknown_vehicle():
+    text = generate(20, seed=2)
+    zones = solve(text, "fcfs")
+    zones[1] = np.append(zones[1], 10**9)
+    assert problems(text, zones) == [f"zone 1: vehicle {10**9} is not in the testcase"]
+
+
+def test_long_cycle_is_reported_without_minimizing_forever():
+    # breadth-first search from every node of a ring would take quadratic time
+    n = 100000
+    src = np.arange(n)
+    edges = cycle(n, src, (src + 1) % n, np.zeros(n, dtype=bool))
+    assert sorted(edges) == list(range(n))